@@ -4,6 +4,7 @@ Template views for dashboard app.
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
 from django.utils import timezone
 from django.utils.translation import gettext as _
 from datetime import timedelta
@@ -65,7 +66,7 @@ def dashboard_view(request):
     trend_qs = (
         _scope_queryset(Sale.objects, pharmacy)
         .filter(date__gte=start_7)
-        .extra(select={'day': "date(date)"})
+        .annotate(day=TruncDate('date'))
         .values('day')
         .annotate(total_sales=Count('id'), total_amount=Sum('total_amount'))
         .order_by('day')
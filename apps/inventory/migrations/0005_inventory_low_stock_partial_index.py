@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_purchaseorder_supplier_stockmovement_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(condition=models.Q(('current_stock__lt', models.F('min_stock_level'))), fields=['pharmacy', 'medicine'], name='inv_low_stock_partial'),
+        ),
+    ]
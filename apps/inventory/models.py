@@ -9,6 +9,7 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import F, Q
 from django.core.validators import MinValueValidator
 from django.utils.translation import gettext_lazy as _
 from apps.medicines.models import Medicine
@@ -61,6 +62,11 @@ class Inventory(models.Model):
         ordering = ['medicine__name']
         indexes = [
             models.Index(fields=['current_stock']),
+            models.Index(
+                fields=['pharmacy', 'medicine'],
+                condition=Q(current_stock__lt=F('min_stock_level')),
+                name='inv_low_stock_partial',
+            ),
         ]
     
     def __str__(self):
@@ -13,13 +13,14 @@ Formulas:
 """
 from __future__ import annotations
 
+from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 from math import ceil, sqrt
 
 from django.db import transaction
-from django.db.models import Sum
-from django.db.models.functions import TruncDate
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest, TruncDate
 from django.utils import timezone
 
 from apps.sales.models import SaleItem
@@ -39,6 +40,28 @@ class InventoryOptimizationService:
     DEFAULT_ALPHA = 0.3
     DEFAULT_FORECAST_DAYS = 30
 
+    @staticmethod
+    def _daily_demand_window(lookback_days, end_date=None):
+        final_day = end_date or timezone.now().date()
+        return final_day - timedelta(days=lookback_days - 1), final_day
+
+    @staticmethod
+    def _build_daily_demand(demand_by_day, start_day, final_day):
+        dates = []
+        series = []
+        cursor = start_day
+        while cursor <= final_day:
+            dates.append(cursor.isoformat())
+            series.append(float(demand_by_day.get(cursor, 0.0)))
+            cursor += timedelta(days=1)
+
+        average_daily_demand = (sum(series) / len(series)) if series else 0.0
+        return {
+            "dates": dates,
+            "series": series,
+            "average_daily_demand": average_daily_demand,
+        }
+
     @staticmethod
     def calculate_daily_demand(medicine, pharmacy, lookback_days=DEFAULT_LOOKBACK_DAYS, end_date=None):
         """
@@ -56,8 +79,7 @@ class InventoryOptimizationService:
         if lookback_days <= 0:
             return {"dates": [], "series": [], "average_daily_demand": 0.0}
 
-        final_day = end_date or timezone.now().date()
-        start_day = final_day - timedelta(days=lookback_days - 1)
+        start_day, final_day = InventoryOptimizationService._daily_demand_window(lookback_days, end_date)
 
         rows = (
             SaleItem.objects.filter(
@@ -72,20 +94,48 @@ class InventoryOptimizationService:
             .order_by("day")
         )
         demand_by_day = {row["day"]: float(row.get("total_quantity") or 0.0) for row in rows}
+        return InventoryOptimizationService._build_daily_demand(demand_by_day, start_day, final_day)
 
-        dates = []
-        series = []
-        cursor = start_day
-        while cursor <= final_day:
-            dates.append(cursor.isoformat())
-            series.append(float(demand_by_day.get(cursor, 0.0)))
-            cursor += timedelta(days=1)
+    @staticmethod
+    def calculate_daily_demand_bulk(medicine_ids, pharmacy=None, lookback_days=DEFAULT_LOOKBACK_DAYS, end_date=None):
+        """
+        Build daily demand series for many medicines with one grouped query.
+
+        Returns ``{medicine_id: demand_data}`` in the ``calculate_daily_demand``
+        format for every id in ``medicine_ids``. ``pharmacy=None`` reads the
+        sale items of each medicine's own pharmacy.
+        """
+        medicine_ids = list(medicine_ids)
+        if lookback_days <= 0:
+            return {
+                medicine_id: {"dates": [], "series": [], "average_daily_demand": 0.0}
+                for medicine_id in medicine_ids
+            }
+
+        start_day, final_day = InventoryOptimizationService._daily_demand_window(lookback_days, end_date)
+
+        rows = SaleItem.objects.filter(
+            medicine_id__in=medicine_ids,
+            sale__date__date__gte=start_day,
+            sale__date__date__lte=final_day,
+        )
+        if pharmacy is not None:
+            rows = rows.filter(pharmacy=pharmacy)
+        rows = (
+            rows.annotate(day=TruncDate("sale__date"))
+            .values("medicine_id", "day")
+            .annotate(total_quantity=Sum("quantity"))
+            .order_by()
+        )
+        demand_by_medicine = defaultdict(dict)
+        for row in rows:
+            demand_by_medicine[row["medicine_id"]][row["day"]] = float(row["total_quantity"] or 0.0)
 
-        average_daily_demand = (sum(series) / len(series)) if series else 0.0
         return {
-            "dates": dates,
-            "series": series,
-            "average_daily_demand": average_daily_demand,
+            medicine_id: InventoryOptimizationService._build_daily_demand(
+                demand_by_medicine.get(medicine_id, {}), start_day, final_day
+            )
+            for medicine_id in medicine_ids
         }
 
     @staticmethod
@@ -119,10 +169,14 @@ class InventoryOptimizationService:
         pharmacy,
         forecast_days=DEFAULT_FORECAST_DAYS,
         lookback_days=DEFAULT_LOOKBACK_DAYS,
+        demand_data=None,
     ):
         """
         Compute moving-average demand forecast.
 
+        ``demand_data`` may carry a series already loaded by
+        ``calculate_daily_demand_bulk``; otherwise it is queried here.
+
         Outputs:
         - 7-day moving average
         - 30-day moving average
@@ -130,11 +184,12 @@ class InventoryOptimizationService:
         - forecasted daily demand and total horizon demand
         - in-sample accuracy metrics
         """
-        demand_data = InventoryOptimizationService.calculate_daily_demand(
-            medicine=medicine,
-            pharmacy=pharmacy,
-            lookback_days=lookback_days,
-        )
+        if demand_data is None:
+            demand_data = InventoryOptimizationService.calculate_daily_demand(
+                medicine=medicine,
+                pharmacy=pharmacy,
+                lookback_days=lookback_days,
+            )
         series = demand_data["series"]
         avg_daily = float(demand_data["average_daily_demand"])
 
@@ -151,11 +206,7 @@ class InventoryOptimizationService:
         forecasted_quantity = max(0.0, forecasted_daily_demand * max(forecast_days, 0))
 
         predictions = InventoryOptimizationService._moving_average_predictions(series, 7)
-        metrics = {
-            "mape": InventoryOptimizationService.calculate_mape(series[1:], predictions[1:]) if len(series) > 1 else None,
-            "mae": InventoryOptimizationService.calculate_mae(series[1:], predictions[1:]) if len(series) > 1 else None,
-            "rmse": InventoryOptimizationService.calculate_rmse(series[1:], predictions[1:]) if len(series) > 1 else None,
-        }
+        metrics = InventoryOptimizationService.calculate_accuracy(series[1:], predictions[1:])
 
         return {
             "medicine_id": medicine.id,
@@ -177,22 +228,26 @@ class InventoryOptimizationService:
         forecast_days=DEFAULT_FORECAST_DAYS,
         alpha=DEFAULT_ALPHA,
         lookback_days=DEFAULT_LOOKBACK_DAYS,
+        demand_data=None,
     ):
         """
         Single Exponential Smoothing (SES).
 
         Recurrence:
         F(t+1) = alpha * A(t) + (1 - alpha) * F(t)
+
+        ``demand_data`` is handled as in ``moving_average_forecast``.
         """
         alpha = float(alpha)
         if alpha <= 0 or alpha >= 1:
             alpha = InventoryOptimizationService.DEFAULT_ALPHA
 
-        demand_data = InventoryOptimizationService.calculate_daily_demand(
-            medicine=medicine,
-            pharmacy=pharmacy,
-            lookback_days=lookback_days,
-        )
+        if demand_data is None:
+            demand_data = InventoryOptimizationService.calculate_daily_demand(
+                medicine=medicine,
+                pharmacy=pharmacy,
+                lookback_days=lookback_days,
+            )
         series = demand_data["series"]
         if not series:
             return {
@@ -206,26 +261,18 @@ class InventoryOptimizationService:
                 "accuracy": {"mape": None, "mae": None, "rmse": None},
             }
 
-        level = float(series[0])
+        # Series values are already floats (see _build_daily_demand)
+        decay = 1.0 - alpha
+        level = series[0]
         one_step_predictions = [level]
         for actual in series[1:]:
             one_step_predictions.append(level)
-            level = alpha * float(actual) + (1.0 - alpha) * level
+            level = alpha * actual + decay * level
 
         forecasted_daily_demand = max(0.0, level)
         forecasted_quantity = forecasted_daily_demand * max(forecast_days, 0)
 
-        metrics = {
-            "mape": InventoryOptimizationService.calculate_mape(series[1:], one_step_predictions[1:])
-            if len(series) > 1
-            else None,
-            "mae": InventoryOptimizationService.calculate_mae(series[1:], one_step_predictions[1:])
-            if len(series) > 1
-            else None,
-            "rmse": InventoryOptimizationService.calculate_rmse(series[1:], one_step_predictions[1:])
-            if len(series) > 1
-            else None,
-        }
+        metrics = InventoryOptimizationService.calculate_accuracy(series[1:], one_step_predictions[1:])
 
         return {
             "medicine_id": medicine.id,
@@ -238,6 +285,35 @@ class InventoryOptimizationService:
             "accuracy": metrics,
         }
 
+    @staticmethod
+    def calculate_accuracy(actual_values, predicted_values):
+        """
+        MAPE, MAE and RMSE in a single pass over the pairs.
+
+        Same results as the three ``calculate_*`` helpers below, which each
+        walk the series separately.
+        """
+        count = 0
+        abs_error_sum = 0.0
+        sq_error_sum = 0.0
+        pct_error_sum = 0.0
+        pct_count = 0
+        for actual, predicted in zip(actual_values or [], predicted_values or []):
+            error = float(actual) - float(predicted)
+            count += 1
+            abs_error_sum += abs(error)
+            sq_error_sum += error * error
+            if actual != 0:
+                pct_error_sum += abs(error / float(actual))
+                pct_count += 1
+        if not count:
+            return {"mape": None, "mae": None, "rmse": None}
+        return {
+            "mape": (pct_error_sum / pct_count) * 100.0 if pct_count else None,
+            "mae": abs_error_sum / count,
+            "rmse": sqrt(sq_error_sum / count),
+        }
+
     @staticmethod
     def calculate_mape(actual_values, predicted_values):
         """Mean Absolute Percentage Error (in %), ignoring zero actuals."""
@@ -303,15 +379,26 @@ class InventoryOptimizationService:
         forecast_days=DEFAULT_FORECAST_DAYS,
         alpha=DEFAULT_ALPHA,
         lookback_days=DEFAULT_LOOKBACK_DAYS,
+        demand_data=None,
     ):
         """
         Compare moving-average and exponential-smoothing forecasts by MAPE.
+
+        Both models run on the same demand series, loaded once here unless
+        ``demand_data`` is given.
         """
+        if demand_data is None:
+            demand_data = InventoryOptimizationService.calculate_daily_demand(
+                medicine=medicine,
+                pharmacy=pharmacy,
+                lookback_days=lookback_days,
+            )
         moving = InventoryOptimizationService.moving_average_forecast(
             medicine=medicine,
             pharmacy=pharmacy,
             forecast_days=forecast_days,
             lookback_days=lookback_days,
+            demand_data=demand_data,
         )
         exponential = InventoryOptimizationService.exponential_smoothing(
             medicine=medicine,
@@ -319,6 +406,7 @@ class InventoryOptimizationService:
             forecast_days=forecast_days,
             alpha=alpha,
             lookback_days=lookback_days,
+            demand_data=demand_data,
         )
 
         ma_mape = moving["accuracy"].get("mape")
@@ -662,6 +750,38 @@ class InventoryService:
             user=user if getattr(user, "is_authenticated", False) else None,
         )
 
+    @staticmethod
+    def decrement_stock(quantities_by_medicine):
+        """
+        Subtract sold quantities, keyed by medicine id, in a single UPDATE.
+
+        Stock is floored at zero in SQL, so concurrent sales cannot lose updates.
+        The rows are locked in primary-key order first so that concurrent POS
+        batches touching overlapping medicines queue up instead of deadlocking.
+        Medicines without an inventory row are ignored.
+        """
+        if not quantities_by_medicine:
+            return 0
+        sold = Case(
+            *[
+                When(medicine_id=medicine_id, then=Value(quantity))
+                for medicine_id, quantity in quantities_by_medicine.items()
+            ],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+        with transaction.atomic():
+            locked_ids = list(
+                Inventory.objects.select_for_update()
+                .filter(medicine_id__in=quantities_by_medicine)
+                .order_by("pk")
+                .values_list("pk", flat=True)
+            )
+            return Inventory.objects.filter(pk__in=locked_ids).update(
+                current_stock=Greatest(F("current_stock") - sold, Value(0)),
+                updated_at=timezone.now(),
+            )
+
     @staticmethod
     def adjust_stock(
         *,
@@ -712,6 +832,96 @@ class InventoryService:
             )
             return movement
 
+    @staticmethod
+    def record_sale_stock(*, sale, sale_items, user=None, reason=""):
+        """
+        Subtract a sale's items from inventory in bulk.
+
+        Equivalent to calling ``adjust_stock`` once per item, but loads, creates
+        and updates the inventory rows and writes the ledger entries in a
+        constant number of queries.
+        """
+        user = user if getattr(user, "is_authenticated", False) else None
+        medicine_ids = {item.medicine_id for item in sale_items}
+        with transaction.atomic():
+            # Lock the rows (in pk order, like decrement_stock) so the
+            # read-modify-write below cannot lose a concurrent sale.
+            inventories = {
+                inventory.medicine_id: inventory
+                for inventory in Inventory.objects.select_for_update()
+                .filter(medicine_id__in=medicine_ids)
+                .order_by("pk")
+            }
+            missing = [
+                Inventory(
+                    medicine_id=medicine_id,
+                    pharmacy=sale.pharmacy,
+                    current_stock=0,
+                    min_stock_level=20,
+                    max_stock_level=120,
+                )
+                for medicine_id in medicine_ids - inventories.keys()
+            ]
+            if missing:
+                # A concurrent sale may create the same rows first; skip those
+                # and lock whichever row won, since ignore_conflicts leaves the
+                # created instances without primary keys.
+                Inventory.objects.bulk_create(missing, ignore_conflicts=True)
+                inventories.update(
+                    (inventory.medicine_id, inventory)
+                    for inventory in Inventory.objects.select_for_update()
+                    .filter(medicine_id__in=[inventory.medicine_id for inventory in missing])
+                    .order_by("pk")
+                )
+
+            movements = []
+            activity_logs = []
+            for item in sale_items:
+                inventory = inventories[item.medicine_id]
+                quantity_change = -int(item.quantity)
+                inventory.current_stock = max(0, int(inventory.current_stock) + quantity_change)
+                movements.append(
+                    StockMovement(
+                        pharmacy_id=inventory.pharmacy_id,
+                        inventory=inventory,
+                        medicine_id=item.medicine_id,
+                        movement_type=StockMovement.TYPE_SALE,
+                        quantity_change=quantity_change,
+                        stock_after=inventory.current_stock,
+                        unit_cost=item.medicine.cost_price,
+                        source_type="Sale",
+                        source_id=sale.id,
+                        reason=reason,
+                        user=user,
+                    )
+                )
+                activity_logs.append(
+                    ActivityLog(
+                        pharmacy_id=inventory.pharmacy_id,
+                        user=user,
+                        action=ActivityLog.ACTION_STOCK,
+                        entity_type="Inventory",
+                        entity_id=inventory.id,
+                        description=f"{item.medicine.name}: stock changed by {quantity_change:+d}",
+                        metadata={
+                            "medicine_id": item.medicine_id,
+                            "movement_type": StockMovement.TYPE_SALE,
+                            "quantity_change": quantity_change,
+                            "stock_after": inventory.current_stock,
+                            "source_type": "Sale",
+                            "source_id": sale.id,
+                        },
+                    )
+                )
+
+            now = timezone.now()
+            for inventory in inventories.values():
+                inventory.updated_at = now
+            Inventory.objects.bulk_update(list(inventories.values()), ["current_stock", "updated_at"])
+            StockMovement.objects.bulk_create(movements)
+            ActivityLog.objects.bulk_create(activity_logs)
+        return movements
+
     @staticmethod
     def set_stock(*, inventory, new_quantity, user=None, reason="Manual stock count"):
         new_quantity = max(0, int(new_quantity))
@@ -199,7 +199,7 @@ class InventoryViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
                     {"error": _("pharmacy_id is required for superuser")},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-            pharmacy = Pharmacy.objects.filter(id=pharmacy_id).first()
+            pharmacy = Pharmacy.objects.only("id", "name").filter(pk=pharmacy_id).first()
             if pharmacy is None:
                 return Response({"error": _("Pharmacy not found")}, status=status.HTTP_404_NOT_FOUND)
         else:
@@ -3,12 +3,14 @@ Medicine models for Pharmacy Analytic AI.
 
 This module defines models for medicine categories and individual medicines.
 """
+from datetime import timedelta
 from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.db.models import Q
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -152,14 +154,10 @@ class Medicine(models.Model):
         """
         if not self.expiry_date:
             return False
-        from django.utils import timezone
-        from datetime import timedelta
-        threshold = timezone.now().date() + timedelta(days=days)
-        return self.expiry_date <= threshold
+        return self.expiry_date <= timezone.localdate() + timedelta(days=days)
     
     def is_expired(self):
         """Check if medicine has expired."""
         if not self.expiry_date:
             return False
-        from django.utils import timezone
-        return self.expiry_date < timezone.now().date()
+        return self.expiry_date < timezone.localdate()
@@ -111,10 +111,8 @@ class MedicineSerializer(serializers.ModelSerializer):
     
     def get_current_stock(self, obj):
         """Get current stock from inventory."""
-        try:
-            return obj.inventory.current_stock
-        except:
-            return 0
+        inventory = getattr(obj, "inventory", None)
+        return inventory.current_stock if inventory is not None else 0
 
 
 class MedicineListSerializer(serializers.ModelSerializer):
@@ -143,10 +141,8 @@ class MedicineListSerializer(serializers.ModelSerializer):
     
     def get_current_stock(self, obj):
         """Get current stock from inventory."""
-        try:
-            return obj.inventory.current_stock
-        except:
-            return 0
+        inventory = getattr(obj, "inventory", None)
+        return inventory.current_stock if inventory is not None else 0
 
     def get_is_expired(self, obj):
         """Check if medicine has expired."""
@@ -154,7 +150,7 @@ class MedicineListSerializer(serializers.ModelSerializer):
 
     def get_is_low_stock(self, obj):
         """Check if current stock is below minimum stock level."""
-        try:
-            return obj.inventory.current_stock < obj.inventory.min_stock_level
-        except:
+        inventory = getattr(obj, "inventory", None)
+        if inventory is None:
             return False
+        return inventory.current_stock < inventory.min_stock_level
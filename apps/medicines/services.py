@@ -1,4 +1,4 @@
-from decimal import Decimal, InvalidOperation
+from decimal import Decimal
 
 from django.core.exceptions import ValidationError
 from django.db import transaction
@@ -38,22 +38,17 @@ class MedicineService:
 
         unit_price = medicine_data.get("unit_price")
         if unit_price is not None and not isinstance(unit_price, Decimal):
-            try:
-                medicine_data["unit_price"] = Decimal(str(unit_price))
-            except (InvalidOperation, TypeError, ValueError):
-                raise ValidationError({"unit_price": _("Unit price is invalid.")})
+            raise ValidationError({"unit_price": _("Unit price is invalid.")})
 
         with transaction.atomic():
             medicine = Medicine.objects.create(
                 pharmacy=pharmacy,
                 **medicine_data,
             )
-            Inventory.objects.update_or_create(
+            Inventory.objects.create(
                 medicine=medicine,
-                defaults={
-                    "pharmacy": pharmacy,
-                    "current_stock": initial_stock,
-                },
+                pharmacy=pharmacy,
+                current_stock=initial_stock,
             )
 
         return medicine
@@ -5,15 +5,19 @@ Handles CRUD operations for medicines and categories, plus expiry alerts
 and CSV import/export.
 """
 import csv
+import json
 from datetime import timedelta
 from decimal import Decimal, InvalidOperation
+from itertools import islice
 
 from django.db import IntegrityError, transaction
 from django.db.models import F
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import filters, viewsets
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 
@@ -53,13 +57,16 @@ class MedicineViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
     Provides CRUD operations for medicines with filtering and search.
     """
 
-    queryset = Medicine.objects.select_related("category", "pharmacy").all()
+    queryset = Medicine.objects.select_related("category", "pharmacy", "inventory").all()
     permission_classes = [MedicineRolePermission]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name", "sku", "barcode", "description"]
     ordering_fields = ["name", "unit_price", "expiry_date", "created_at"]
     ordering = ["name"]
 
+    EXPIRY_STREAMING_THRESHOLD = 1000
+    EXPIRY_STREAM_CHUNK_SIZE = 500
+
     def get_serializer_class(self):
         if self.action == "list":
             return MedicineListSerializer
@@ -67,6 +74,7 @@ class MedicineViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
 
     def get_queryset(self):
         queryset = self.get_tenant_queryset(super().get_queryset())
+        today = timezone.localdate()
 
         category_id = self.request.query_params.get("category")
         if category_id:
@@ -74,15 +82,11 @@ class MedicineViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
 
         expiring_soon = self.request.query_params.get("expiring_soon")
         if expiring_soon == "true":
-            threshold = timezone.now().date() + timedelta(days=30)
-            queryset = queryset.filter(
-                expiry_date__lte=threshold,
-                expiry_date__gte=timezone.now().date(),
-            )
+            queryset = queryset.filter(expiry_date__range=(today, today + timedelta(days=30)))
 
         expired = self.request.query_params.get("expired")
         if expired == "true":
-            queryset = queryset.filter(expiry_date__lt=timezone.now().date())
+            queryset = queryset.filter(expiry_date__lt=today)
 
         low_stock = self.request.query_params.get("low_stock")
         if low_stock == "true":
@@ -103,21 +107,65 @@ class MedicineViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
     @action(detail=False, methods=["get"])
     def expiring_soon(self, request):
         days = int(request.query_params.get("days", 30))
-        threshold = timezone.now().date() + timedelta(days=days)
+        today = timezone.localdate()
 
         medicines = self.get_queryset().filter(
-            expiry_date__lte=threshold,
-            expiry_date__gte=timezone.now().date(),
+            expiry_date__range=(today, today + timedelta(days=days)),
         ).order_by("expiry_date")
-
-        serializer = self.get_serializer(medicines, many=True)
-        return Response({"count": medicines.count(), "days": days, "medicines": serializer.data})
+        return self._expiry_response(medicines, days=days)
 
     @action(detail=False, methods=["get"])
     def expired(self, request):
-        medicines = self.get_queryset().filter(expiry_date__lt=timezone.now().date()).order_by("expiry_date")
-        serializer = self.get_serializer(medicines, many=True)
-        return Response({"count": medicines.count(), "medicines": serializer.data})
+        medicines = self.get_queryset().filter(expiry_date__lt=timezone.localdate()).order_by("expiry_date")
+        return self._expiry_response(medicines)
+
+    def _expiry_response(self, medicines, **extra):
+        """
+        Serialize an expiry listing, streaming it once it grows past the threshold.
+
+        Small result sets, and any request negotiated to a non-JSON renderer
+        (e.g. the browsable API), keep the regular buffered Response. Large
+        JSON listings are read with iterator() and emitted chunk by chunk so
+        only one chunk of model instances is held in memory at a time.
+        """
+        count = medicines.count()
+        header = {"count": count, **extra}
+        renderer = getattr(self.request, "accepted_renderer", None)
+        if count < self.EXPIRY_STREAMING_THRESHOLD or not isinstance(renderer, JSONRenderer):
+            serializer = self.get_serializer(medicines, many=True)
+            return Response({**header, "medicines": serializer.data})
+        return StreamingHttpResponse(
+            self._stream_medicines(medicines, header, renderer),
+            content_type=renderer.media_type,
+        )
+
+    def _stream_medicines(self, medicines, header, renderer):
+        """Yield the same document JSONRenderer would produce for ``{**header, "medicines": [...]}``."""
+        separators = SHORT_SEPARATORS if renderer.compact else LONG_SEPARATORS
+
+        def dumps(value):
+            encoded = json.dumps(
+                value,
+                cls=renderer.encoder_class,
+                ensure_ascii=renderer.ensure_ascii,
+                allow_nan=not renderer.strict,
+                separators=separators,
+            )
+            # Same escaping JSONRenderer applies for JavaScript consumers
+            return encoded.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+        item_separator, key_separator = separators
+        yield "{" + "".join(
+            dumps(key) + key_separator + dumps(value) + item_separator for key, value in header.items()
+        ) + dumps("medicines") + key_separator + "["
+
+        chunk_size = self.EXPIRY_STREAM_CHUNK_SIZE
+        prefix = ""
+        rows = medicines.iterator(chunk_size=chunk_size)
+        for batch in iter(lambda: list(islice(rows, chunk_size)), []):
+            yield prefix + item_separator.join(dumps(row) for row in self.get_serializer(batch, many=True).data)
+            prefix = item_separator
+        yield "]}"
 
     @action(detail=False, methods=["get"])
     def export_csv(self, request):
@@ -1,7 +1,6 @@
 """
 Template views for medicines app.
 """
-import json
 from decimal import Decimal, InvalidOperation
 
 from django import forms
@@ -21,6 +20,7 @@ from apps.inventory.models import Inventory
 from apps.accounts.permissions import can_delete_medicines, can_manage_medicines
 from apps.tenants.models import Pharmacy
 from apps.tenants.utils import require_user_pharmacy
+from pharmacy_ai.compat import json_loads
 from .models import Category, Medicine
 from .services import MedicineService
 
@@ -87,9 +87,15 @@ class MedicineUpdateForm(forms.ModelForm):
         medicine = super().save(commit=commit)
         stock_value = self.cleaned_data.get("stock")
         if stock_value is not None:
-            inventory, _ = Inventory.objects.get_or_create(medicine=medicine, pharmacy=medicine.pharmacy)
-            inventory.current_stock = stock_value
-            inventory.save(update_fields=["current_stock", "updated_at"])
+            # The inventory was already loaded in __init__ for the initial stock value.
+            inventory = getattr(medicine, "inventory", None)
+            if inventory is None:
+                Inventory.objects.create(
+                    medicine=medicine, pharmacy=medicine.pharmacy, current_stock=stock_value
+                )
+            elif inventory.current_stock != stock_value:
+                inventory.current_stock = stock_value
+                inventory.save(update_fields=["current_stock", "updated_at"])
         return medicine
 
 
@@ -119,19 +125,17 @@ def medicine_create_view(request: HttpRequest) -> HttpResponse:
 
     For JSON POST (template fetch), returns JSON response.
     """
-    if request.method == "GET":
-        if not can_manage_medicines(request.user):
-            raise PermissionDenied(_("You do not have permission to create medicines."))
-        return render(request, "medicines/create.html")
-
     if not can_manage_medicines(request.user):
         raise PermissionDenied(_("You do not have permission to create medicines."))
 
+    if request.method == "GET":
+        return render(request, "medicines/create.html")
+
     content_type = request.content_type or ""
     is_json = content_type.startswith("application/json")
     if is_json:
         try:
-            payload = json.loads(request.body.decode("utf-8") or "{}")
+            payload = json_loads(request.body or b"{}")
         except (TypeError, ValueError):
             return JsonResponse({"detail": _("Invalid JSON payload.")}, status=400)
     else:
@@ -310,7 +314,8 @@ def medicine_delete_view(request: HttpRequest, pk: int) -> HttpResponse:
     if not can_delete_medicines(request.user):
         raise PermissionDenied(_("You do not have permission to delete medicines."))
 
-    medicine = get_object_or_404(_tenant_medicine_queryset(request), pk=pk)
+    # Deletion only needs the primary key; skip the joins and wide columns.
+    medicine = get_object_or_404(_tenant_medicine_queryset(request).select_related(None).only("id"), pk=pk)
 
     try:
         medicine.delete()
@@ -0,0 +1,24 @@
+"""
+Parsers for POS integration app.
+
+POS systems push large JSON payloads, so ingestion endpoints parse them with
+orjson when it is available.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+from pharmacy_ai.compat import json_loads
+
+
+class ORJSONParser(BaseParser):
+    """
+    Parse JSON request bodies straight from UTF-8 bytes.
+    """
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return json_loads(stream.read())
+        except ValueError as exc:
+            raise ParseError(_('JSON parse error - %(error)s') % {'error': str(exc)})
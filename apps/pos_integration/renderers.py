@@ -0,0 +1,25 @@
+"""
+Renderers for POS integration app.
+
+Bulk and CSV ingestion responses can list thousands of sales, so they are
+serialized with orjson when it is available.
+"""
+from rest_framework.renderers import JSONRenderer
+
+from pharmacy_ai.compat import json_dumps
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON renderer backed by orjson.
+
+    Values orjson cannot encode natively (Decimal, lazy translations) go through
+    DRF's JSONEncoder, so the output matches the default renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return json_dumps(data, default=self.encoder_class().default)
@@ -3,16 +3,58 @@ Serializers for POS integration app.
 
 Handles serialization of POS data for ingestion.
 """
+from collections import defaultdict
+from decimal import Decimal
+
 from rest_framework import serializers
 from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
+from apps.inventory.services import InventoryService
 from apps.sales.models import Sale, SaleItem
+from apps.sales.services import SalesAnalyticsService
 from apps.medicines.models import Medicine
 from apps.tenants.services import SubscriptionService
 from apps.tenants.utils import require_user_pharmacy
 
 
+# Medicine columns the POS ingestion paths need to price and record a sale.
+# SKU is only unique per pharmacy, so in_bulk(field_name="sku") is not usable.
+POS_MEDICINE_FIELDS = ("id", "sku", "unit_price", "pharmacy")
+
+
+def resolve_pos_pharmacy(context):
+    """
+    Return the pharmacy a POS payload is recorded against.
+
+    An explicit ``pharmacy`` in the serializer context wins; otherwise a
+    non-superuser's own pharmacy is used. Superusers without one get None.
+    """
+    pharmacy = context.get("pharmacy")
+    if pharmacy is not None:
+        return pharmacy
+    user = context.get("user")
+    if user and user.is_authenticated and not user.is_superuser:
+        return require_user_pharmacy(user)
+    return None
+
+
+def enforce_monthly_sales_limit(context, pharmacy, count=1):
+    """Ensure ``pharmacy`` can record ``count`` more sales this month; superusers are exempt."""
+    user = context.get("user")
+    if user and user.is_authenticated and user.is_superuser:
+        return
+    try:
+        remaining = SubscriptionService.remaining_quota(pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES)
+    except DjangoValidationError as exc:
+        if hasattr(exc, "message_dict"):
+            raise serializers.ValidationError(exc.message_dict)
+        raise serializers.ValidationError({"subscription": exc.messages})
+    if remaining is not None and remaining < count:
+        raise serializers.ValidationError({"subscription": [_("Monthly sales limit exceeded.")]})
+
+
 class POSSaleItemSerializer(serializers.Serializer):
     """
     Serializer for POS sale item data.
@@ -22,28 +64,10 @@ class POSSaleItemSerializer(serializers.Serializer):
     medicine_sku = serializers.CharField(help_text=_("Medicine SKU"))
     medicine_name = serializers.CharField(required=False, help_text=_("Medicine name (optional)"))
     quantity = serializers.IntegerField(min_value=1)
-    unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
-
-    def _get_target_pharmacy(self):
-        pharmacy = self.context.get("pharmacy")
-        if pharmacy is not None:
-            return pharmacy
-        user = self.context.get("user")
-        if user and user.is_authenticated and not user.is_superuser:
-            return require_user_pharmacy(user)
-        return None
-    
-    def validate_medicine_sku(self, value):
-        """Validate that medicine with SKU exists."""
-        queryset = Medicine.objects.filter(sku=value)
-        pharmacy = self._get_target_pharmacy()
-        if pharmacy is not None:
-            queryset = queryset.filter(pharmacy=pharmacy)
-        if not queryset.exists():
-            raise serializers.ValidationError(
-                _("Medicine with SKU '%(sku)s' not found.") % {"sku": value}
-            )
-        return value
+    # Matches the saleitem_positive constraint, so bad prices are a 400, not an IntegrityError
+    unit_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=Decimal("0.01"), required=False
+    )
 
 
 class POSSaleSerializer(serializers.Serializer):
@@ -62,6 +86,33 @@ class POSSaleSerializer(serializers.Serializer):
         if not value:
             raise serializers.ValidationError(_("Sale must have at least one item."))
         return value
+
+    def validate(self, attrs):
+        """
+        Validate that every item SKU exists, using one query for the whole sale.
+
+        The resolved medicines are kept in ``medicines_by_sku`` for ``create``.
+        """
+        items = attrs['items']
+        medicine_query = Medicine.objects.filter(sku__in={item['medicine_sku'] for item in items}).only(
+            *POS_MEDICINE_FIELDS
+        )
+        pharmacy = resolve_pos_pharmacy(self.context)
+        if pharmacy is not None:
+            medicine_query = medicine_query.filter(pharmacy=pharmacy)
+        medicines_by_sku = {medicine.sku: medicine for medicine in medicine_query}
+
+        item_errors = [
+            {}
+            if item['medicine_sku'] in medicines_by_sku
+            else {'medicine_sku': [_("Medicine with SKU '%(sku)s' not found.") % {"sku": item['medicine_sku']}]}
+            for item in items
+        ]
+        if any(item_errors):
+            raise serializers.ValidationError({'items': item_errors})
+
+        attrs['medicines_by_sku'] = medicines_by_sku
+        return attrs
     
     def create(self, validated_data):
         """
@@ -70,71 +121,58 @@ class POSSaleSerializer(serializers.Serializer):
         Handles medicine lookup by SKU and creates sale with items.
         """
         items_data = validated_data.pop('items')
+        medicines_by_sku = validated_data.pop('medicines_by_sku')
         sale_date = validated_data.get('date')
         user = self.context.get("user")
 
-        pharmacy = self.context.get("pharmacy")
-        if pharmacy is None:
-            if user and user.is_authenticated and not user.is_superuser:
-                pharmacy = require_user_pharmacy(user)
-            elif user and user.is_authenticated and user.is_superuser:
-                raise serializers.ValidationError({"pharmacy": _("Superuser must provide pharmacy context.")})
-
-        if not (user and user.is_authenticated and user.is_superuser):
-            try:
-                SubscriptionService.enforce_limits(pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES)
-            except DjangoValidationError as exc:
-                if hasattr(exc, "message_dict"):
-                    raise serializers.ValidationError(exc.message_dict)
-                raise serializers.ValidationError({"subscription": exc.messages})
-
-        # Create sale
-        sale = Sale.objects.create(
-            date=sale_date or timezone.now(),
-            user=user,
-            pharmacy=pharmacy,
-            notes=validated_data.get('notes', ''),
-            total_amount=0,
-        )
-        
+        pharmacy = resolve_pos_pharmacy(self.context)
+        if pharmacy is None and user and user.is_authenticated and user.is_superuser:
+            raise serializers.ValidationError({"pharmacy": _("Superuser must provide pharmacy context.")})
+
+        if not self.context.get("monthly_sales_reserved"):
+            enforce_monthly_sales_limit(self.context, pharmacy)
+
         total_amount = 0
+        sale_items = []
+        sold_quantities = defaultdict(int)
         
-        # Create sale items
+        # Build sale items first so the sale is inserted with its final total;
+        # bulk_create skips SaleItem.save(), so the subtotal is computed here.
         for item_data in items_data:
-            try:
-                medicine_query = Medicine.objects.filter(sku=item_data['medicine_sku'])
-                if pharmacy is not None:
-                    medicine_query = medicine_query.filter(pharmacy=pharmacy)
-                medicine = medicine_query.get()
-                unit_price = item_data.get('unit_price', medicine.unit_price)
-                
-                sale_item = SaleItem.objects.create(
-                    sale=sale,
-                    pharmacy=sale.pharmacy,
-                    medicine=medicine,
-                    quantity=item_data['quantity'],
-                    unit_price=unit_price
-                )
-                
-                total_amount += sale_item.subtotal
-                
-                # Update inventory (subtract sold quantity)
-                try:
-                    inventory = medicine.inventory
-                    inventory.current_stock -= item_data['quantity']
-                    if inventory.current_stock < 0:
-                        inventory.current_stock = 0
-                    inventory.save()
-                except:
-                    pass  # Inventory might not exist
-                    
-            except Medicine.DoesNotExist:
-                # Skip invalid items or handle error
-                continue
-        
-        # Update sale total
-        sale.total_amount = total_amount
-        sale.save()
+            medicine = medicines_by_sku[item_data['medicine_sku']]
+            quantity = item_data['quantity']
+            unit_price = item_data.get('unit_price', medicine.unit_price)
+            subtotal = quantity * unit_price
+            
+            sale_items.append(SaleItem(
+                pharmacy=pharmacy,
+                medicine=medicine,
+                quantity=quantity,
+                unit_price=unit_price,
+                subtotal=subtotal,
+            ))
+            
+            total_amount += subtotal
+            
+            sold_quantities[medicine.id] += quantity
+
+        with transaction.atomic():
+            # Create sale
+            sale = Sale.objects.create(
+                date=sale_date or timezone.now(),
+                user=user,
+                pharmacy=pharmacy,
+                notes=validated_data.get('notes', ''),
+                total_amount=total_amount,
+            )
+
+            for sale_item in sale_items:
+                sale_item.sale = sale
+            SaleItem.objects.bulk_create(sale_items, batch_size=500)
+
+            # Update inventory (subtract sold quantities)
+            InventoryService.decrement_stock(sold_quantities)
+            SalesAnalyticsService.invalidate_cache(sale.pharmacy_id)
         
         return sale
 
@@ -152,10 +190,13 @@ class POSBulkSaleSerializer(serializers.Serializer):
         sales_data = validated_data['sales']
         created_sales = []
         
-        for sale_data in sales_data:
-            serializer = POSSaleSerializer(data=sale_data, context=self.context)
-            if serializer.is_valid():
-                sale = serializer.save()
-                created_sales.append(sale)
+        # Nested sales were already validated with the parent payload, so the
+        # child serializer only has to create them. The monthly quota is
+        # checked once for the whole batch rather than once per sale.
+        enforce_monthly_sales_limit(self.context, resolve_pos_pharmacy(self.context), count=len(sales_data))
+        child = POSSaleSerializer(context={**self.context, "monthly_sales_reserved": True})
+        with transaction.atomic():
+            for sale_data in sales_data:
+                created_sales.append(child.create(dict(sale_data)))
         
         return created_sales
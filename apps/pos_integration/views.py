@@ -4,20 +4,55 @@ API views for POS integration app.
 Handles POS data ingestion via REST API and CSV import.
 """
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, parser_classes, permission_classes, renderer_classes
+from rest_framework.parsers import FormParser, MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.permissions import IsAuthenticated
-from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import DatabaseError, transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 import csv
 import io
-from .serializers import POSSaleSerializer, POSBulkSaleSerializer
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from .parsers import ORJSONParser
+from .renderers import ORJSONRenderer
+from .serializers import POS_MEDICINE_FIELDS, POSSaleSerializer, POSBulkSaleSerializer
+from apps.inventory.services import InventoryService
 from apps.sales.models import Sale, SaleItem
+from apps.sales.services import SalesAnalyticsService
 from apps.medicines.models import Medicine
 from apps.tenants.models import Pharmacy
 from apps.tenants.services import SubscriptionService
 from apps.tenants.utils import require_user_pharmacy
+from pharmacy_ai.compat import json_dumps
+
+
+CSV_IMPORT_CHUNK_SIZE = 500
+
+
+def _parse_csv_sale_date(value):
+    """
+    Parse a CSV ``date`` cell such as ``2024-01-15 10:30:00``.
+
+    Uses the C-level ``datetime.fromisoformat`` instead of ``strptime``; naive
+    values are made aware in the current timezone. Returns None when the cell
+    is empty or malformed.
+    """
+    if not value:
+        return None
+    try:
+        sale_date = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if timezone.is_naive(sale_date):
+        sale_date = timezone.make_aware(sale_date)
+    return sale_date
 
 
 def _resolve_request_pharmacy(request):
@@ -31,6 +66,8 @@ def _resolve_request_pharmacy(request):
 
 
 @api_view(['POST'])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
+@parser_classes([ORJSONParser, FormParser, MultiPartParser])
 @permission_classes([IsAuthenticated])  # Can be changed to AllowAny with API key authentication
 def receive_sale(request):
     """
@@ -64,13 +101,15 @@ def receive_sale(request):
         return Response({
             'message': _('Sale received successfully'),
             'sale_id': sale.id,
-            'total_amount': float(sale.total_amount)
+            'total_amount': sale.total_amount
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['POST'])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
+@parser_classes([ORJSONParser, FormParser, MultiPartParser])
 @permission_classes([IsAuthenticated])
 def receive_bulk_sales(request):
     """
@@ -102,13 +141,14 @@ def receive_bulk_sales(request):
         return Response({
             'message': _('%(count)s sales received successfully') % {'count': len(sales)},
             'count': len(sales),
-            'sales': [{'id': sale.id, 'total_amount': float(sale.total_amount)} for sale in sales]
+            'sales': [{'id': sale.id, 'total_amount': sale.total_amount} for sale in sales]
         }, status=status.HTTP_201_CREATED)
     
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 @api_view(['POST'])
+@renderer_classes([ORJSONRenderer, BrowsableAPIRenderer])
 @permission_classes([IsAuthenticated])
 def import_csv_sales(request):
     """
@@ -122,6 +162,9 @@ def import_csv_sales(request):
     2024-01-15 11:00:00,MED002,1,25.00,Second sale
     
     Note: Each row creates a separate sale with one item.
+
+    Pass ``?stream=ndjson`` to receive one JSON object per line (``{"sale": ...}``
+    or ``{"error": ...}``) as each chunk is imported, followed by a summary line.
     """
     pharmacy = _resolve_request_pharmacy(request)
     if request.user.is_superuser and pharmacy is None:
@@ -138,109 +181,30 @@ def import_csv_sales(request):
     
     csv_file = request.FILES['file']
     
-    # Read CSV file
+    # Stream the CSV straight off the upload rather than decoding it in memory
     try:
-        decoded_file = csv_file.read().decode('utf-8')
-        io_string = io.StringIO(decoded_file)
-        reader = csv.DictReader(io_string)
+        reader = csv.DictReader(io.TextIOWrapper(csv_file.file, encoding='utf-8', newline=''))
+        reader.fieldnames  # Read the header now so encoding errors surface here
     except Exception as e:
         return Response(
             {'error': _('Error reading CSV file: %(error)s') % {'error': str(e)}},
             status=status.HTTP_400_BAD_REQUEST
         )
     
+    results = _iter_csv_import(reader, pharmacy, request.user)
+
+    if request.query_params.get('stream') == 'ndjson':
+        # One JSON object per line, flushed after every chunk of rows
+        return StreamingHttpResponse(
+            _ndjson_lines(results),
+            content_type='application/x-ndjson',
+            status=status.HTTP_200_OK,
+        )
+
     created_sales = []
     errors = []
-    
-    for row_num, row in enumerate(reader, start=2):  # Start at 2 (header is row 1)
-        try:
-            # Parse date
-            sale_date = timezone.now()
-            if 'date' in row and row['date']:
-                try:
-                    from datetime import datetime
-                    sale_date = datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S')
-                    sale_date = timezone.make_aware(sale_date)
-                except:
-                    pass  # Use current time if parsing fails
-            
-            # Get medicine
-            medicine_sku = row.get('medicine_sku', '').strip()
-            if not medicine_sku:
-                errors.append(
-                    _('Row %(row)s: medicine_sku is required') % {'row': row_num}
-                )
-                continue
-            
-            try:
-                medicine = Medicine.objects.get(sku=medicine_sku, pharmacy=pharmacy)
-            except Medicine.DoesNotExist:
-                errors.append(
-                    _('Row %(row)s: Medicine with SKU "%(sku)s" not found')
-                    % {'row': row_num, 'sku': medicine_sku}
-                )
-                continue
-            
-            # Get quantity and price
-            quantity = int(row.get('quantity', 1))
-            unit_price = float(row.get('unit_price', medicine.unit_price))
-            notes = row.get('notes', '')
-            
-            # Create sale
-            if not request.user.is_superuser:
-                try:
-                    SubscriptionService.enforce_limits(pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES)
-                except DjangoValidationError as exc:
-                    if hasattr(exc, "message_dict"):
-                        limit_message = str(exc.message_dict)
-                    else:
-                        limit_message = ", ".join(exc.messages)
-                    errors.append(
-                        _('Row %(row)s: %(message)s') % {'row': row_num, 'message': limit_message}
-                    )
-                    continue
-
-            sale = Sale.objects.create(
-                date=sale_date,
-                user=request.user,
-                pharmacy=pharmacy,
-                notes=notes,
-                total_amount=0  # Will be updated
-            )
-            
-            # Create sale item
-            sale_item = SaleItem.objects.create(
-                sale=sale,
-                pharmacy=pharmacy,
-                medicine=medicine,
-                quantity=quantity,
-                unit_price=unit_price
-            )
-            
-            # Update sale total
-            sale.total_amount = sale_item.subtotal
-            sale.save()
-            
-            # Update inventory
-            try:
-                inventory = medicine.inventory
-                inventory.current_stock -= quantity
-                if inventory.current_stock < 0:
-                    inventory.current_stock = 0
-                inventory.save()
-            except:
-                pass  # Inventory might not exist
-            
-            created_sales.append({
-                'id': sale.id,
-                'date': sale.date.isoformat(),
-                'total_amount': float(sale.total_amount)
-            })
-            
-        except Exception as e:
-            errors.append(
-                _('Row %(row)s: %(error)s') % {'row': row_num, 'error': str(e)}
-            )
+    for kind, value in results:
+        (created_sales if kind == 'sale' else errors).append(value)
 
     return Response({
         'message': _('Imported %(count)s sales') % {'count': len(created_sales)},
@@ -248,3 +212,190 @@ def import_csv_sales(request):
         'errors': errors,
         'sales': created_sales
     }, status=status.HTTP_201_CREATED if created_sales else status.HTTP_400_BAD_REQUEST)
+
+
+def _ndjson_lines(results):
+    """Encode import results as NDJSON, ending with a summary line."""
+    default = JSONEncoder().default
+    counts = {'sale': 0, 'error': 0}
+    for kind, value in results:
+        counts[kind] += 1
+        yield json_dumps({kind: value}, default=default) + b'\n'
+    yield json_dumps({'created': counts['sale'], 'errors': counts['error']}) + b'\n'
+
+
+def _save_csv_sales(pending_rows, pharmacy):
+    """Insert buffered CSV sales with their items and stock changes in one transaction."""
+    sold_quantities = defaultdict(int)
+    for _row_num, _sale, item in pending_rows:
+        sold_quantities[item.medicine_id] += item.quantity
+    with transaction.atomic():
+        Sale.objects.bulk_create([sale for _row_num, sale, _item in pending_rows])
+        SaleItem.objects.bulk_create([item for _row_num, _sale, item in pending_rows])
+        # Update inventory (subtract sold quantities)
+        InventoryService.decrement_stock(sold_quantities)
+        SalesAnalyticsService.invalidate_cache(pharmacy.pk)
+
+
+def _write_csv_chunk(pending_rows, pharmacy):
+    """
+    Commit one chunk of buffered CSV rows.
+
+    The chunk is inserted in bulk; if the database rejects it, each row is
+    retried on its own so a single bad row fails alone. Returns the saved
+    sales and ``(row_num, error)`` pairs for rows that could not be written.
+    """
+    if not pending_rows:
+        return [], []
+    try:
+        _save_csv_sales(pending_rows, pharmacy)
+    except DatabaseError:
+        pass
+    else:
+        return [sale for _row_num, sale, _item in pending_rows], []
+
+    saved_sales = []
+    failed_rows = []
+    for row in pending_rows:
+        row_num, sale, item = row
+        # Forget any primary key handed out by the rolled-back bulk insert
+        sale.pk = None
+        sale._state.adding = True
+        item.pk = None
+        item._state.adding = True
+        item.sale = sale
+        try:
+            _save_csv_sales([row], pharmacy)
+        except DatabaseError as e:
+            failed_rows.append((row_num, e))
+        else:
+            saved_sales.append(sale)
+    return saved_sales, failed_rows
+
+
+def _iter_csv_import(reader, pharmacy, user):
+    """
+    Import CSV sale rows chunk by chunk.
+
+    Each chunk is written in its own transaction, and its ``('sale', payload)``
+    and ``('error', message)`` pairs are yielded only after that transaction
+    commits. A streaming client therefore never holds locks open, and a
+    disconnect cannot roll back sales that were already reported.
+    """
+    medicines_by_sku = {}
+
+    remaining_sales = None
+    if not user.is_superuser:
+        remaining_sales = SubscriptionService.remaining_quota(
+            pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES
+        )
+
+    # Start at 2 (header is row 1)
+    numbered_rows = enumerate(reader, start=2)
+    try:
+        for rows in iter(lambda: list(islice(numbered_rows, CSV_IMPORT_CHUNK_SIZE)), []):
+            skus = {(row.get('medicine_sku') or '').strip() for _, row in rows}
+            skus.discard('')
+            skus.difference_update(medicines_by_sku)
+            if skus:
+                medicines_by_sku.update(
+                    (medicine.sku, medicine)
+                    for medicine in Medicine.objects.filter(pharmacy=pharmacy, sku__in=skus).only(*POS_MEDICINE_FIELDS)
+                )
+
+            pending_rows = []
+            errors = []
+
+            for row_num, row in rows:
+                try:
+                    # Parse date
+                    sale_date = _parse_csv_sale_date(row.get('date')) or timezone.now()
+                
+                    # Get medicine
+                    medicine_sku = row.get('medicine_sku', '').strip()
+                    if not medicine_sku:
+                        errors.append(
+                            _('Row %(row)s: medicine_sku is required') % {'row': row_num}
+                        )
+                        continue
+                
+                    medicine = medicines_by_sku.get(medicine_sku)
+                    if medicine is None:
+                        errors.append(
+                            _('Row %(row)s: Medicine with SKU "%(sku)s" not found')
+                            % {'row': row_num, 'sku': medicine_sku}
+                        )
+                        continue
+                
+                    # Get quantity and price
+                    quantity = int(row.get('quantity', 1))
+                    raw_unit_price = (row.get('unit_price') or '').strip()
+                    try:
+                        unit_price = Decimal(raw_unit_price) if raw_unit_price else medicine.unit_price
+                    except InvalidOperation:
+                        unit_price = None
+                    notes = row.get('notes', '')
+                
+                    if quantity < 1:
+                        errors.append(
+                            _('Row %(row)s: quantity must be at least 1') % {'row': row_num}
+                        )
+                        continue
+                    if unit_price is not None and unit_price.is_finite():
+                        # Round first so a price like 0.001 cannot reach the DB as 0.00
+                        unit_price = unit_price.quantize(Decimal('0.01'))
+                    if unit_price is None or not unit_price.is_finite() or unit_price < Decimal('0.01'):
+                        errors.append(
+                            _('Row %(row)s: unit_price must be a positive number') % {'row': row_num}
+                        )
+                        continue
+                
+                    # Create sale; rows are buffered and inserted in bulk below, so the
+                    # monthly quota is counted down locally instead of re-queried.
+                    if remaining_sales is not None:
+                        if remaining_sales <= 0:
+                            errors.append(
+                                _('Row %(row)s: %(message)s')
+                                % {'row': row_num, 'message': _('Monthly sales limit exceeded.')}
+                            )
+                            continue
+                        remaining_sales -= 1
+
+                    subtotal = quantity * unit_price
+                    sale = Sale(
+                        date=sale_date,
+                        user=user,
+                        pharmacy=pharmacy,
+                        notes=notes,
+                        total_amount=subtotal,
+                    )
+                    pending_rows.append((row_num, sale, SaleItem(
+                        sale=sale,
+                        pharmacy=pharmacy,
+                        medicine=medicine,
+                        quantity=quantity,
+                        unit_price=unit_price,
+                        subtotal=subtotal,
+                    )))
+                
+                except Exception as e:
+                    errors.append(
+                        _('Row %(row)s: %(error)s') % {'row': row_num, 'error': str(e)}
+                    )
+
+            saved_sales, failed_rows = _write_csv_chunk(pending_rows, pharmacy)
+            for row_num, error in failed_rows:
+                errors.append(_('Row %(row)s: %(error)s') % {'row': row_num, 'error': str(error)})
+                if remaining_sales is not None:
+                    remaining_sales += 1
+
+            for error in errors:
+                yield 'error', error
+            for sale in saved_sales:
+                yield 'sale', {
+                    'id': sale.id,
+                    'date': sale.date.isoformat(),
+                    'total_amount': sale.total_amount
+                }
+    except (UnicodeDecodeError, csv.Error) as e:
+        yield 'error', _('Error reading CSV file: %(error)s') % {'error': str(e)}
@@ -16,6 +16,7 @@ class SaleItemInline(admin.TabularInline):
 class SaleAdmin(admin.ModelAdmin):
     """Admin interface for Sale model."""
     list_display = ['id', 'date', 'pharmacy', 'user', 'total_amount', 'created_at']
+    list_select_related = ['pharmacy', 'user']
     list_filter = ['pharmacy', 'date', 'user', 'created_at']
     search_fields = ['id', 'user__username', 'notes', 'pharmacy__name']
     readonly_fields = ['created_at', 'updated_at']
@@ -27,6 +28,7 @@ class SaleAdmin(admin.ModelAdmin):
 class SaleItemAdmin(admin.ModelAdmin):
     """Admin interface for SaleItem model."""
     list_display = ['id', 'sale', 'pharmacy', 'medicine', 'quantity', 'unit_price', 'subtotal', 'created_at']
+    list_select_related = ['sale', 'pharmacy', 'medicine']
     list_filter = ['pharmacy', 'created_at', 'medicine__category']
     search_fields = ['medicine__name', 'sale__id', 'pharmacy__name']
     readonly_fields = ['subtotal', 'created_at']
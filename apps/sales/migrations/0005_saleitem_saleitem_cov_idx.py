@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_alter_saleitem_subtotal'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['sale', 'medicine'], include=('quantity', 'unit_price', 'subtotal'), name='saleitem_cov_idx'),
+        ),
+    ]
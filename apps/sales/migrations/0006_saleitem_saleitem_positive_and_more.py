@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:20
+
+from django.db import migrations, models
+
+
+def check_existing_sale_items(apps, schema_editor):
+    """
+    Refuse to add the constraints while rows that violate them exist.
+
+    The POS and CSV import paths used to write sale items without running
+    the model validators, so older databases may hold zero or negative lines.
+    They are money records, so they are reported for manual correction
+    rather than rewritten or deleted here.
+    """
+    SaleItem = apps.get_model('sales', 'SaleItem')
+    offending = (
+        SaleItem.objects.using(schema_editor.connection.alias)
+        .filter(
+            models.Q(quantity__lt=1)
+            | models.Q(unit_price__lte=0)
+            | models.Q(subtotal__lte=0)
+        )
+        .order_by('pk')
+    )
+    ids = list(offending.values_list('pk', flat=True)[:20])
+    if ids:
+        raise RuntimeError(
+            'Cannot add the saleitem_positive/saleitem_subtotal_pos constraints: '
+            '%d sale item(s) have a quantity below 1 or a non-positive unit_price or subtotal '
+            '(first ids: %s). Correct or delete them, then re-run migrate.'
+            % (offending.count(), ', '.join(str(pk) for pk in ids))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0005_saleitem_saleitem_cov_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_existing_sale_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='saleitem',
+            constraint=models.CheckConstraint(check=models.Q(('quantity__gte', 1), ('unit_price__gt', 0)), name='saleitem_positive'),
+        ),
+        migrations.AddConstraint(
+            model_name='saleitem',
+            constraint=models.CheckConstraint(check=models.Q(('subtotal__gt', 0)), name='saleitem_subtotal_pos'),
+        ),
+    ]
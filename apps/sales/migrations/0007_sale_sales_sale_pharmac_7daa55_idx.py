@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-15 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_saleitem_saleitem_positive_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(fields=['pharmacy', 'date'], name='sales_sale_pharmac_7daa55_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 00:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0007_sale_sales_sale_pharmac_7daa55_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='saleitem',
+            index=models.Index(fields=['pharmacy', 'medicine', 'sale'], name='sales_salei_pharmac_95eada_idx'),
+        ),
+    ]
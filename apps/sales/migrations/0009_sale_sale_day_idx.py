@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 01:05
+
+from django.db import migrations, models
+import django.db.models.functions.datetime
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0008_saleitem_sales_salei_pharmac_95eada_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='sale',
+            index=models.Index(django.db.models.functions.datetime.TruncDate('date'), name='sale_day_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 01:06
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0009_sale_sale_day_idx'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='saleitem',
+            name='sales_salei_sale_id_413ea3_idx',
+        ),
+    ]
@@ -8,6 +8,7 @@ from decimal import Decimal
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import TruncDate
 from django.utils.translation import gettext_lazy as _
 
 from apps.accounts.models import User
@@ -59,6 +60,8 @@ class Sale(models.Model):
         indexes = [
             models.Index(fields=["date"]),
             models.Index(fields=["user"]),
+            models.Index(fields=["pharmacy", "date"]),
+            models.Index(TruncDate("date"), name="sale_day_idx"),
         ]
 
     def __str__(self):
@@ -72,7 +75,8 @@ class Sale(models.Model):
             Decimal: Total amount of all sale items
         """
 
-        return sum(item.subtotal for item in self.items.all())
+        total = self.items.aggregate(total=models.Sum("subtotal"))["total"]
+        return total if total is not None else Decimal("0.00")
 
 
 class SaleItem(models.Model):
@@ -123,8 +127,26 @@ class SaleItem(models.Model):
         verbose_name_plural = _("Sale Items")
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["sale"]),
             models.Index(fields=["medicine"]),
+            models.Index(fields=["pharmacy", "medicine", "sale"]),
+            # Lets the sale detail prefetch read its rows from the index alone,
+            # and its (sale) prefix serves lookups by sale. INCLUDE is
+            # PostgreSQL-only; SQLite builds a plain index (models.W040 is
+            # silenced in the dev/test settings for that reason).
+            models.Index(
+                fields=["sale", "medicine"],
+                include=["quantity", "unit_price", "subtotal"],
+                name="saleitem_cov_idx",
+            ),
+        ]
+        # Enforced by the database so bulk_create paths, which skip the field
+        # validators, cannot store empty or negative lines.
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(quantity__gte=1) & models.Q(unit_price__gt=0),
+                name="saleitem_positive",
+            ),
+            models.CheckConstraint(check=models.Q(subtotal__gt=0), name="saleitem_subtotal_pos"),
         ]
 
     def __str__(self):
@@ -10,8 +10,9 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db import transaction
 from django.utils.translation import gettext_lazy as _
 from .models import Sale, SaleItem
+from .services import SalesAnalyticsService
 from apps.medicines.models import Medicine
-from apps.inventory.models import ActivityLog, Inventory, StockMovement
+from apps.inventory.models import ActivityLog
 from apps.inventory.services import InventoryService
 from apps.tenants.services import SubscriptionService
 from apps.tenants.utils import require_user_pharmacy
@@ -36,6 +37,7 @@ class SaleItemSerializer(serializers.ModelSerializer):
             'quantity', 'unit_price', 'subtotal', 'created_at'
         ]
         read_only_fields = ['id', 'medicine', 'subtotal', 'created_at']
+        extra_kwargs = {'unit_price': {'min_value': Decimal('0.01')}}
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -57,7 +59,8 @@ class SaleSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     user_username = serializers.CharField(source='user.username', read_only=True)
     pharmacy_name = serializers.CharField(source='pharmacy.name', read_only=True)
-    items_count = serializers.SerializerMethodField()
+    # Annotated with Count('items') by SaleViewSet.get_queryset
+    items_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Sale
@@ -67,10 +70,6 @@ class SaleSerializer(serializers.ModelSerializer):
             'notes', 'items', 'items_count', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'date', 'total_amount', 'created_at', 'updated_at', 'items_count', 'pharmacy_name']
-    
-    def get_items_count(self, obj):
-        """Get count of items in the sale."""
-        return obj.items.count()
 
 
 class SaleCreateSerializer(serializers.ModelSerializer):
@@ -100,11 +99,31 @@ class SaleCreateSerializer(serializers.ModelSerializer):
         pharmacy = require_user_pharmacy(request.user)
         self.fields["items"].child.fields["medicine_id"].queryset = Medicine.objects.filter(pharmacy=pharmacy)
     
+    def validate(self, attrs):
+        """
+        Check that every item's medicine belongs to the sale pharmacy.
+
+        The medicines were already loaded by ``medicine_id``, so this is a
+        single in-memory pass rather than a per-item check inside ``create``.
+        """
+        request = self.context.get("request")
+        if request and request.user.is_authenticated and not request.user.is_superuser:
+            pharmacy = require_user_pharmacy(request.user)
+        else:
+            pharmacy = attrs.get("pharmacy")
+        if pharmacy is None:
+            return attrs
+        pharmacy_pk = pharmacy.pk
+        if any(item["medicine"].pharmacy_id != pharmacy_pk for item in attrs.get("items", [])):
+            raise serializers.ValidationError({"items": _("Medicine does not belong to sale pharmacy.")})
+        return attrs
+
     def create(self, validated_data):
         """
         Create sale and associated sale items.
         
-        Automatically calculates total_amount from items.
+        total_amount is computed from the items before the sale is inserted,
+        so the sale row is written exactly once.
         """
         items_data = validated_data.pop('items')
         request = self.context.get("request")
@@ -135,47 +154,30 @@ class SaleCreateSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError(exc.message_dict)
                 raise serializers.ValidationError({"subscription": exc.messages})
 
-        initial_total = Decimal("0.00")
+        total_amount = Decimal("0.00")
         for item_data in items_data:
-            initial_total += item_data["quantity"] * item_data["unit_price"]
-        if initial_total <= 0:
+            total_amount += item_data["quantity"] * item_data["unit_price"]
+        if total_amount <= 0:
             raise serializers.ValidationError({"items": _("At least one valid sale item is required.")})
 
         with transaction.atomic():
-            sale = Sale.objects.create(total_amount=initial_total, **validated_data)
+            sale = Sale.objects.create(total_amount=total_amount, **validated_data)
 
-            total_amount = Decimal("0.00")
+            pharmacy_pk = sale.pharmacy_id
+            sale_items = []
             for item_data in items_data:
-                item_data["pharmacy"] = sale.pharmacy
-                if item_data["medicine"].pharmacy_id != sale.pharmacy_id:
-                    raise serializers.ValidationError(
-                        {"items": _("Medicine does not belong to sale pharmacy.")}
-                    )
-                item = SaleItem.objects.create(sale=sale, **item_data)
-                total_amount += item.subtotal
-
-                inventory, created_inventory = Inventory.objects.get_or_create(
-                    medicine=item.medicine,
-                    pharmacy=sale.pharmacy,
-                    defaults={
-                        'current_stock': 0,
-                        'min_stock_level': 20,
-                        'max_stock_level': 120,
-                    }
-                )
-                InventoryService.adjust_stock(
-                    inventory=inventory,
-                    quantity_change=-item.quantity,
-                    movement_type=StockMovement.TYPE_SALE,
-                    user=sale.user,
-                    unit_cost=item.medicine.cost_price,
-                    source_type="Sale",
-                    source_id=sale.id,
-                    reason=_("Sale checkout"),
-                )
-
-            sale.total_amount = total_amount
-            sale.save()
+                # bulk_create skips SaleItem.save(), so the subtotal is set here
+                subtotal = item_data["quantity"] * item_data["unit_price"]
+                sale_items.append(SaleItem(sale=sale, pharmacy_id=pharmacy_pk, subtotal=subtotal, **item_data))
+
+            SaleItem.objects.bulk_create(sale_items, batch_size=500)
+            InventoryService.record_sale_stock(
+                sale=sale,
+                sale_items=sale_items,
+                user=sale.user,
+                reason=_("Sale checkout"),
+            )
+
             InventoryService.log_activity(
                 pharmacy=sale.pharmacy,
                 user=sale.user,
@@ -188,6 +190,7 @@ class SaleCreateSerializer(serializers.ModelSerializer):
                     "items_count": len(items_data),
                 },
             )
+            SalesAnalyticsService.invalidate_cache(pharmacy_pk)
 
             return sale
 
@@ -198,7 +201,8 @@ class SaleListSerializer(serializers.ModelSerializer):
     """
     user_name = serializers.CharField(source='user.get_full_name', read_only=True)
     pharmacy_name = serializers.CharField(source='pharmacy.name', read_only=True)
-    items_count = serializers.SerializerMethodField()
+    # Annotated with Count('items') by SaleViewSet.get_queryset
+    items_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Sale
@@ -206,7 +210,34 @@ class SaleListSerializer(serializers.ModelSerializer):
             'id', 'date', 'total_amount', 'user_name',
             'pharmacy_name', 'items_count', 'created_at'
         ]
-    
-    def get_items_count(self, obj):
-        """Get count of items in the sale."""
-        return obj.items.count()
+
+    # Columns read by ``from_values``; ``items_count`` must be annotated.
+    values_fields = (
+        "id", "date", "total_amount", "user_id", "user__first_name", "user__last_name",
+        "pharmacy__name", "items_count", "created_at",
+    )
+
+    @classmethod
+    def from_values(cls, rows):
+        """
+        Render ``values(*values_fields)`` rows exactly like ``to_representation``.
+
+        The list endpoint uses this to skip building a model instance per sale.
+        """
+        fields = cls().fields
+        date_field, total_field, created_field = fields["date"], fields["total_amount"], fields["created_at"]
+        data = []
+        for row in rows:
+            item = {
+                "id": row["id"],
+                "date": date_field.to_representation(row["date"]),
+                "total_amount": total_field.to_representation(row["total_amount"]),
+            }
+            # Like the ``user.get_full_name`` source, omit the key for sales without a user
+            if row["user_id"] is not None:
+                item["user_name"] = f"{row['user__first_name']} {row['user__last_name']}".strip()
+            item["pharmacy_name"] = row["pharmacy__name"]
+            item["items_count"] = row["items_count"]
+            item["created_at"] = created_field.to_representation(row["created_at"])
+            data.append(item)
+        return data
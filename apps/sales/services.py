@@ -1,9 +1,18 @@
 """
 Sales analytics and forecasting services.
 """
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-
-from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, Max, Min, Q, Sum
+from decimal import ROUND_HALF_UP, Decimal
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, F, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import Cast, ExtractHour, TruncDate, TruncMonth
 from django.utils import timezone
 
 from apps.inventory.services import InventoryOptimizationService
@@ -15,6 +24,76 @@ from .models import Sale, SaleItem
 class SalesAnalyticsService:
     """Read-oriented analytics service for pharmacy-scoped sales reporting."""
 
+    CACHE_PREFIX = "sales:analytics"
+    CACHE_TIMEOUT = 120
+    FORECAST_ACCURACY_CACHE_TIMEOUT = 300
+    ANALYTICS_WORKERS = 6
+
+    @staticmethod
+    def _cache_version_key(pharmacy_id):
+        scope = pharmacy_id if pharmacy_id is not None else "all"
+        return f"{SalesAnalyticsService.CACHE_PREFIX}:version:{scope}"
+
+    @staticmethod
+    def cache_key(pharmacy, *parts):
+        """
+        Build a cache key for analytics of ``pharmacy`` (``None`` for all pharmacies).
+
+        The key embeds the pharmacy's current cache version, so
+        ``invalidate_cache`` retires every entry at once. Versions are
+        timestamps, so an evicted version never revives stale entries.
+        The bump only reaches processes that share the cache backend
+        (``REDIS_URL`` in production); per-process LocMemCache entries in
+        other workers expire on their timeout instead.
+        """
+        pharmacy_id = getattr(pharmacy, "pk", None)
+        version = cache.get_or_set(SalesAnalyticsService._cache_version_key(pharmacy_id), time.time_ns, None)
+        suffix = ":".join(str(part) for part in parts)
+        return f"{SalesAnalyticsService.CACHE_PREFIX}:{pharmacy_id or 'all'}:{version}:{suffix}"
+
+    @staticmethod
+    def invalidate_cache(pharmacy_id):
+        """Retire cached analytics for a pharmacy and the all-pharmacies view after commit."""
+
+        def bump():
+            version = time.time_ns()
+            cache.set_many(
+                {
+                    SalesAnalyticsService._cache_version_key(pharmacy_id): version,
+                    SalesAnalyticsService._cache_version_key(None): version,
+                },
+                None,
+            )
+
+        transaction.on_commit(bump)
+
+    @staticmethod
+    def run_concurrently(tasks):
+        """
+        Run independent read-only queries, overlapping them where the database allows.
+
+        Each worker thread opens its own connection, so this falls back to
+        running in order on SQLite (single writer, in-memory test databases)
+        and inside a transaction, whose uncommitted rows other connections
+        cannot see. Workers close their connection when done, so an uncached
+        call costs up to ``SALES_ANALYTICS_WORKERS`` fresh connections
+        regardless of ``CONN_MAX_AGE``; setting it to 1 runs in order.
+        """
+        workers = getattr(settings, "SALES_ANALYTICS_WORKERS", SalesAnalyticsService.ANALYTICS_WORKERS)
+        if workers <= 1 or connection.vendor == "sqlite" or connection.in_atomic_block:
+            return {name: task() for name, task in tasks.items()}
+
+        def run(task):
+            try:
+                return task()
+            finally:
+                # Connections are per thread; release this worker's one.
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(run, task) for name, task in tasks.items()}
+            return {name: future.result() for name, future in futures.items()}
+
     @staticmethod
     def _scope_sales(pharmacy=None):
         queryset = Sale.objects.all()
@@ -38,27 +117,26 @@ class SalesAnalyticsService:
 
     @staticmethod
     def get_analytics(start_date=None, end_date=None, pharmacy=None):
+        cache_key = SalesAnalyticsService.cache_key(pharmacy, "summary", start_date, end_date)
+        analytics = cache.get(cache_key)
+        if analytics is None:
+            analytics = SalesAnalyticsService._compute_analytics(start_date, end_date, pharmacy)
+            cache.set(cache_key, analytics, SalesAnalyticsService.CACHE_TIMEOUT)
+        return analytics
+
+    @staticmethod
+    def _compute_analytics(start_date=None, end_date=None, pharmacy=None):
+        # One clock reading for every section, so their windows line up
+        now = timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(date__gte=start_date)
         if end_date:
             date_filter &= Q(date__lte=end_date)
         if not start_date and not end_date:
-            start_date = timezone.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
             date_filter = Q(date__gte=start_date)
 
-        sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date_filter)
-        total_sales = sales.count()
-        total_amount = sales.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-        avg_sale_amount = sales.aggregate(Avg("total_amount"))["total_amount__avg"] or 0
-
-        fast_moving = SalesAnalyticsService.get_fast_moving_medicines(days=30, limit=10, pharmacy=pharmacy)
-        slow_moving = SalesAnalyticsService.get_slow_moving_medicines(days=90, pharmacy=pharmacy)
-        trends = SalesAnalyticsService.get_daily_trends(days=7, pharmacy=pharmacy)
-        category_analytics = SalesAnalyticsService.get_category_analytics(start_date, end_date, pharmacy=pharmacy)
-        monthly_trends = SalesAnalyticsService.get_monthly_trends(start_date, end_date, pharmacy=pharmacy)
-        peak_hours = SalesAnalyticsService.get_peak_hours(start_date, end_date, pharmacy=pharmacy)
-
         previous_period_start = None
         previous_period_end = None
         if start_date:
@@ -66,21 +144,53 @@ class SalesAnalyticsService:
             previous_period_end = start_date
             previous_period_start = previous_period_end - timedelta(days=period_days)
 
-        growth_metrics = SalesAnalyticsService.get_growth_metrics(
-            current_start=start_date,
-            current_end=end_date,
-            previous_start=previous_period_start,
-            previous_end=previous_period_end,
-            pharmacy=pharmacy,
-        )
-        forecast_accuracy = SalesAnalyticsService.get_forecast_accuracy_comparison(
-            pharmacy=pharmacy,
-            days=30,
-            limit=10,
+        sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date_filter)
+        # The helpers fall back to their own default windows without a start
+        # date, so they only share this queryset when one is set.
+        period_sales = sales if start_date else None
+        scope = {"pharmacy": pharmacy, "now": now}
+        results = SalesAnalyticsService.run_concurrently(
+            {
+                "summary": partial(
+                    sales.aggregate,
+                    total_sales=Count("id"),
+                    # Not aliased "total_amount": that would shadow the field for Avg/Max/Min
+                    total_revenue=Sum("total_amount", default=0),
+                    average_sale_amount=Avg("total_amount", default=0),
+                    max_sale_amount=Max("total_amount", default=0),
+                    min_sale_amount=Min("total_amount", default=0),
+                ),
+                "fast_moving": partial(SalesAnalyticsService.get_fast_moving_medicines, days=30, limit=10, **scope),
+                "slow_moving": partial(SalesAnalyticsService.get_slow_moving_medicines, days=90, **scope),
+                "trends": partial(SalesAnalyticsService.get_daily_trends, days=7, **scope),
+                "category_analytics": partial(
+                    SalesAnalyticsService.get_category_analytics, start_date, end_date, **scope
+                ),
+                "monthly_trends": partial(
+                    SalesAnalyticsService.get_monthly_trends, start_date, end_date, sales=period_sales, **scope
+                ),
+                "peak_hours": partial(
+                    SalesAnalyticsService.get_peak_hours, start_date, end_date, sales=period_sales, **scope
+                ),
+                "growth_metrics": partial(
+                    SalesAnalyticsService.get_growth_metrics,
+                    current_start=start_date,
+                    current_end=end_date,
+                    previous_start=previous_period_start,
+                    previous_end=previous_period_end,
+                    **scope,
+                ),
+                "forecast_accuracy": partial(
+                    SalesAnalyticsService.get_forecast_accuracy_comparison, days=30, limit=10, **scope
+                ),
+                "profit_metrics": partial(SalesAnalyticsService.get_profit_metrics, start_date, end_date, **scope),
+                "cashier_performance": partial(
+                    SalesAnalyticsService.get_cashier_performance, start_date, end_date, sales=period_sales, **scope
+                ),
+                "stock_value": partial(SalesAnalyticsService.get_stock_value, pharmacy=pharmacy),
+            }
         )
-        profit_metrics = SalesAnalyticsService.get_profit_metrics(start_date, end_date, pharmacy=pharmacy)
-        cashier_performance = SalesAnalyticsService.get_cashier_performance(start_date, end_date, pharmacy=pharmacy)
-        stock_value = SalesAnalyticsService.get_stock_value(pharmacy=pharmacy)
+        summary = results["summary"]
 
         return {
             "period": {
@@ -88,36 +198,37 @@ class SalesAnalyticsService:
                 "end_date": end_date.isoformat() if end_date else None,
             },
             "summary": {
-                "total_sales": total_sales,
-                "total_amount": float(total_amount),
-                "average_sale_amount": float(avg_sale_amount),
-                "max_sale_amount": float(sales.aggregate(Max("total_amount"))["total_amount__max"] or 0),
-                "min_sale_amount": float(sales.aggregate(Min("total_amount"))["total_amount__min"] or 0),
+                "total_sales": summary["total_sales"],
+                "total_amount": float(summary["total_revenue"]),
+                "average_sale_amount": float(summary["average_sale_amount"]),
+                "max_sale_amount": float(summary["max_sale_amount"]),
+                "min_sale_amount": float(summary["min_sale_amount"]),
             },
-            "fast_moving_medicines": fast_moving,
-            "slow_moving_medicines": slow_moving,
+            "fast_moving_medicines": results["fast_moving"],
+            "slow_moving_medicines": results["slow_moving"],
             "trends": {
-                "daily": trends,
-                "monthly": monthly_trends,
+                "daily": results["trends"],
+                "monthly": results["monthly_trends"],
             },
-            "category_analytics": category_analytics,
-            "peak_hours": peak_hours,
-            "growth_metrics": growth_metrics,
-            "forecast_accuracy": forecast_accuracy,
-            "profit_metrics": profit_metrics,
-            "cashier_performance": cashier_performance,
-            "stock_value": stock_value,
+            "category_analytics": results["category_analytics"],
+            "peak_hours": results["peak_hours"],
+            "growth_metrics": results["growth_metrics"],
+            "forecast_accuracy": results["forecast_accuracy"],
+            "profit_metrics": results["profit_metrics"],
+            "cashier_performance": results["cashier_performance"],
+            "stock_value": results["stock_value"],
         }
 
     @staticmethod
-    def get_profit_metrics(start_date=None, end_date=None, pharmacy=None):
+    def get_profit_metrics(start_date=None, end_date=None, pharmacy=None, now=None):
+        now = now or timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(sale__date__gte=start_date)
         if end_date:
             date_filter &= Q(sale__date__lte=end_date)
         if not start_date:
-            date_filter = Q(sale__date__gte=timezone.now() - timedelta(days=30))
+            date_filter = Q(sale__date__gte=now - timedelta(days=30))
 
         profit_expr = ExpressionWrapper(
             F("subtotal") - (F("quantity") * F("medicine__cost_price")),
@@ -139,19 +250,20 @@ class SalesAnalyticsService:
         }
 
     @staticmethod
-    def get_cashier_performance(start_date=None, end_date=None, pharmacy=None):
+    def get_cashier_performance(start_date=None, end_date=None, pharmacy=None, sales=None, now=None):
+        now = now or timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(date__gte=start_date)
         if end_date:
             date_filter &= Q(date__lte=end_date)
         if not start_date:
-            date_filter = Q(date__gte=timezone.now() - timedelta(days=30))
+            date_filter = Q(date__gte=now - timedelta(days=30))
 
+        if sales is None:
+            sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date_filter)
         return list(
-            SalesAnalyticsService._scope_sales(pharmacy)
-            .filter(date_filter)
-            .values("user__id", "user__username", "user__first_name", "user__last_name")
+            sales.values("user__id", "user__username", "user__first_name", "user__last_name")
             .annotate(total_sales=Count("id"), total_revenue=Sum("total_amount"), average_sale=Avg("total_amount"))
             .order_by("-total_revenue")[:10]
         )
@@ -173,8 +285,9 @@ class SalesAnalyticsService:
         }
 
     @staticmethod
-    def get_fast_moving_medicines(days=30, limit=10, pharmacy=None):
-        start_date = timezone.now() - timedelta(days=days)
+    def get_fast_moving_medicines(days=30, limit=10, pharmacy=None, now=None):
+        now = now or timezone.now()
+        start_date = now - timedelta(days=days)
         fast_moving = (
             SalesAnalyticsService._scope_sale_items(pharmacy)
             .filter(sale__date__gte=start_date)
@@ -185,57 +298,39 @@ class SalesAnalyticsService:
         return list(fast_moving)
 
     @staticmethod
-    def get_slow_moving_medicines(days=90, pharmacy=None):
-        start_date = timezone.now() - timedelta(days=days)
-        all_medicines = SalesAnalyticsService._scope_medicines(pharmacy)
-        medicines_with_sales = (
-            SalesAnalyticsService._scope_sale_items(pharmacy)
-            .filter(sale__date__gte=start_date)
-            .values_list("medicine_id", flat=True)
-            .distinct()
-        )
-
-        slow_moving = []
-        for medicine in all_medicines:
-            if medicine.id not in medicines_with_sales:
-                slow_moving.append(
-                    {
-                        "medicine_id": medicine.id,
-                        "medicine_name": medicine.name,
-                        "medicine_sku": medicine.sku,
-                        "total_quantity": 0,
-                        "total_revenue": 0,
-                        "sale_count": 0,
-                    }
-                )
-                continue
-
-            sales_data = (
-                SalesAnalyticsService._scope_sale_items(pharmacy)
-                .filter(medicine=medicine, sale__date__gte=start_date)
-                .aggregate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
+    def get_slow_moving_medicines(days=90, pharmacy=None, now=None):
+        now = now or timezone.now()
+        start_date = now - timedelta(days=days)
+        in_period = Q(sale_items__sale__date__gte=start_date)
+        # One GROUP BY over a LEFT JOIN; medicines without sales sum to 0 and
+        # the threshold is applied as HAVING, so only matching rows come back.
+        return list(
+            SalesAnalyticsService._scope_medicines(pharmacy)
+            .annotate(
+                total_quantity=Sum("sale_items__quantity", filter=in_period, default=0),
+                total_revenue=Cast(Sum("sale_items__subtotal", filter=in_period, default=0), FloatField()),
+                sale_count=Count("sale_items__sale", filter=in_period, distinct=True),
             )
-            if (sales_data["total_quantity"] or 0) < 5:
-                slow_moving.append(
-                    {
-                        "medicine_id": medicine.id,
-                        "medicine_name": medicine.name,
-                        "medicine_sku": medicine.sku,
-                        "total_quantity": sales_data["total_quantity"] or 0,
-                        "total_revenue": float(sales_data["total_revenue"] or 0),
-                        "sale_count": sales_data["sale_count"] or 0,
-                    }
-                )
-
-        return slow_moving
+            .filter(total_quantity__lt=5)
+            .order_by("name")
+            .values(
+                "total_quantity",
+                "total_revenue",
+                "sale_count",
+                medicine_id=F("id"),
+                medicine_name=F("name"),
+                medicine_sku=F("sku"),
+            )
+        )
 
     @staticmethod
-    def get_daily_trends(days=7, pharmacy=None):
-        start_date = timezone.now() - timedelta(days=days)
+    def get_daily_trends(days=7, pharmacy=None, now=None):
+        now = now or timezone.now()
+        start_date = now - timedelta(days=days)
         daily_sales = (
             SalesAnalyticsService._scope_sales(pharmacy)
             .filter(date__gte=start_date)
-            .extra(select={"day": "date(date)"})
+            .annotate(day=TruncDate("date"))
             .values("day")
             .annotate(total_sales=Count("id"), total_amount=Sum("total_amount"))
             .order_by("day")
@@ -243,45 +338,41 @@ class SalesAnalyticsService:
         return list(daily_sales)
 
     @staticmethod
-    def get_monthly_trends(start_date=None, end_date=None, pharmacy=None):
+    def get_monthly_trends(start_date=None, end_date=None, pharmacy=None, sales=None, now=None):
+        now = now or timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(date__gte=start_date)
         if end_date:
             date_filter &= Q(date__lte=end_date)
         if not start_date:
-            start_date = timezone.now() - timedelta(days=365)
+            start_date = now - timedelta(days=365)
             date_filter = Q(date__gte=start_date)
 
+        if sales is None:
+            sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date_filter)
+        # The amount is aliased before .values() so Avg and Sum both read the
+        # column; annotating Sum as total_amount would otherwise shadow it for Avg
         monthly_sales = (
-            SalesAnalyticsService._scope_sales(pharmacy)
-            .filter(date_filter)
-            .extra(select={"month": "strftime('%%Y-%%m', date)"})
+            sales.alias(amount=F("total_amount"))
+            .annotate(month=TruncMonth("date"))
             .values("month")
-            .annotate(total_sales=Count("id"), sum_amount=Sum("total_amount"), avg_sale_amount=Avg("total_amount"))
+            .annotate(total_sales=Count("id"), total_amount=Sum("amount"), avg_sale_amount=Avg("amount"))
             .order_by("month")
         )
-        results = []
-        for row in monthly_sales:
-            results.append(
-                {
-                    "month": row["month"],
-                    "total_sales": row["total_sales"],
-                    "total_amount": row["sum_amount"],
-                    "avg_sale_amount": row["avg_sale_amount"],
-                }
-            )
-        return results
+        # Rows already carry the response keys; only the month label needs formatting
+        return [{**row, "month": row["month"].strftime("%Y-%m")} for row in monthly_sales]
 
     @staticmethod
-    def get_category_analytics(start_date=None, end_date=None, pharmacy=None):
+    def get_category_analytics(start_date=None, end_date=None, pharmacy=None, now=None):
+        now = now or timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(sale__date__gte=start_date)
         if end_date:
             date_filter &= Q(sale__date__lte=end_date)
         if not start_date:
-            start_date = timezone.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
             date_filter = Q(sale__date__gte=start_date)
 
         category_analytics = (
@@ -299,28 +390,33 @@ class SalesAnalyticsService:
         return list(category_analytics)
 
     @staticmethod
-    def get_peak_hours(start_date=None, end_date=None, pharmacy=None):
+    def get_peak_hours(start_date=None, end_date=None, pharmacy=None, sales=None, now=None):
+        now = now or timezone.now()
         date_filter = Q()
         if start_date:
             date_filter &= Q(date__gte=start_date)
         if end_date:
             date_filter &= Q(date__lte=end_date)
         if not start_date:
-            start_date = timezone.now() - timedelta(days=30)
+            start_date = now - timedelta(days=30)
             date_filter = Q(date__gte=start_date)
 
+        if sales is None:
+            sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date_filter)
         hourly_sales = (
-            SalesAnalyticsService._scope_sales(pharmacy)
-            .filter(date_filter)
-            .extra(select={"hour": "strftime('%%H', date)"})
+            sales.annotate(hour=ExtractHour("date"))
             .values("hour")
             .annotate(total_sales=Count("id"), total_amount=Sum("total_amount"))
             .order_by("hour")
         )
-        return list(hourly_sales)
+        # Keep the zero-padded "HH" labels the strftime() version returned
+        return [{**row, "hour": f"{row['hour']:02d}"} for row in hourly_sales]
 
     @staticmethod
-    def get_growth_metrics(current_start=None, current_end=None, previous_start=None, previous_end=None, pharmacy=None):
+    def get_growth_metrics(
+        current_start=None, current_end=None, previous_start=None, previous_end=None, pharmacy=None, now=None
+    ):
+        now = now or timezone.now()
         if not previous_start or not previous_end:
             return {
                 "sales_growth": None,
@@ -328,48 +424,68 @@ class SalesAnalyticsService:
                 "message": "Previous period data not available for comparison",
             }
 
-        current_sales = SalesAnalyticsService._scope_sales(pharmacy).filter(
-            date__gte=current_start if current_start else timezone.now() - timedelta(days=30),
-            date__lte=current_end if current_end else timezone.now(),
+        current_period = Q(
+            date__gte=current_start if current_start else now - timedelta(days=30),
+            date__lte=current_end if current_end else now,
         )
-        current_count = current_sales.count()
-        current_revenue = current_sales.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
-
-        previous_sales = SalesAnalyticsService._scope_sales(pharmacy).filter(date__gte=previous_start, date__lte=previous_end)
-        previous_count = previous_sales.count()
-        previous_revenue = previous_sales.aggregate(Sum("total_amount"))["total_amount__sum"] or 0
+        previous_period = Q(date__gte=previous_start, date__lte=previous_end)
+        # Both periods in one scan via conditional aggregation
+        totals = (
+            SalesAnalyticsService._scope_sales(pharmacy)
+            .filter(current_period | previous_period)
+            .aggregate(
+                current_count=Count("id", filter=current_period),
+                current_revenue=Sum("total_amount", filter=current_period, default=0),
+                previous_count=Count("id", filter=previous_period),
+                previous_revenue=Sum("total_amount", filter=previous_period, default=0),
+            )
+        )
+        current_count = totals["current_count"]
+        current_revenue = Decimal(totals["current_revenue"])
+        previous_count = totals["previous_count"]
+        previous_revenue = Decimal(totals["previous_revenue"])
 
         sales_growth = None
         revenue_growth = None
         if previous_count > 0:
-            sales_growth = ((current_count - previous_count) / previous_count) * 100
+            sales_growth = round(((current_count - previous_count) / previous_count) * 100, 2)
         if previous_revenue > 0:
-            revenue_growth = ((float(current_revenue) - float(previous_revenue)) / float(previous_revenue)) * 100
+            # Stay in Decimal until the response so money math is exact
+            revenue_growth = float(
+                ((current_revenue - previous_revenue) / previous_revenue * 100).quantize(
+                    Decimal("0.01"), rounding=ROUND_HALF_UP
+                )
+            )
 
         return {
             "current_period": {"sales_count": current_count, "revenue": float(current_revenue)},
             "previous_period": {"sales_count": previous_count, "revenue": float(previous_revenue)},
-            "sales_growth": round(sales_growth, 2) if sales_growth is not None else None,
-            "revenue_growth": round(revenue_growth, 2) if revenue_growth is not None else None,
+            "sales_growth": sales_growth,
+            "revenue_growth": revenue_growth,
         }
 
     @staticmethod
     def get_medicine_performance(medicine_id, days=30, pharmacy=None):
         start_date = timezone.now() - timedelta(days=days)
         try:
-            medicine = SalesAnalyticsService._scope_medicines(pharmacy).get(id=medicine_id)
+            medicine = SalesAnalyticsService._scope_medicines(pharmacy).only("id", "name", "sku").get(id=medicine_id)
         except Medicine.DoesNotExist:
             return None
 
         sale_items = SalesAnalyticsService._scope_sale_items(pharmacy).filter(medicine=medicine, sale__date__gte=start_date)
-        total_quantity = sale_items.aggregate(Sum("quantity"))["quantity__sum"] or 0
-        total_revenue = sale_items.aggregate(Sum("subtotal"))["subtotal__sum"] or 0
-        sale_count = sale_items.values("sale").distinct().count()
+        totals = sale_items.aggregate(
+            total_quantity=Sum("quantity", default=0),
+            total_revenue=Sum("subtotal", default=0),
+            sale_count=Count("sale", distinct=True),
+        )
+        total_quantity = totals["total_quantity"]
+        total_revenue = float(totals["total_revenue"])
+        sale_count = totals["sale_count"]
 
         avg_quantity_per_sale = total_quantity / sale_count if sale_count > 0 else 0
-        avg_revenue_per_sale = float(total_revenue) / sale_count if sale_count > 0 else 0
+        avg_revenue_per_sale = total_revenue / sale_count if sale_count > 0 else 0
         avg_daily_quantity = total_quantity / days if days > 0 else 0
-        avg_daily_revenue = float(total_revenue) / days if days > 0 else 0
+        avg_daily_revenue = total_revenue / days if days > 0 else 0
 
         return {
             "medicine_id": medicine.id,
@@ -378,7 +494,7 @@ class SalesAnalyticsService:
             "period_days": days,
             "metrics": {
                 "total_quantity_sold": total_quantity,
-                "total_revenue": float(total_revenue),
+                "total_revenue": total_revenue,
                 "sale_count": sale_count,
                 "avg_quantity_per_sale": round(avg_quantity_per_sale, 2),
                 "avg_revenue_per_sale": round(avg_revenue_per_sale, 2),
@@ -388,11 +504,24 @@ class SalesAnalyticsService:
         }
 
     @staticmethod
-    def get_forecast_accuracy_comparison(pharmacy=None, days=30, limit=10, alpha=0.3):
+    def get_forecast_accuracy_comparison(pharmacy=None, days=30, limit=10, alpha=0.3, now=None):
         """
         Compare forecast models (moving average vs exponential smoothing) for top medicines.
+
+        Results are cached per pharmacy and arguments; new sales retire them
+        through ``invalidate_cache``.
         """
-        start_date = timezone.now() - timedelta(days=days)
+        cache_key = SalesAnalyticsService.cache_key(pharmacy, "forecast_accuracy", days, limit, alpha)
+        comparison = cache.get(cache_key)
+        if comparison is None:
+            comparison = SalesAnalyticsService._compute_forecast_accuracy_comparison(pharmacy, days, limit, alpha, now)
+            cache.set(cache_key, comparison, SalesAnalyticsService.FORECAST_ACCURACY_CACHE_TIMEOUT)
+        return comparison
+
+    @staticmethod
+    def _compute_forecast_accuracy_comparison(pharmacy=None, days=30, limit=10, alpha=0.3, now=None):
+        now = now or timezone.now()
+        start_date = now - timedelta(days=days)
         medicine_ids = list(
             SalesAnalyticsService._scope_sale_items(pharmacy)
             .filter(sale__date__gte=start_date)
@@ -406,15 +535,15 @@ class SalesAnalyticsService:
                 SalesAnalyticsService._scope_medicines(pharmacy).order_by("name").values_list("id", flat=True)[:limit]
             )
 
-        medicines = SalesAnalyticsService._scope_medicines(pharmacy).filter(id__in=medicine_ids)
+        medicines = SalesAnalyticsService._scope_medicines(pharmacy).filter(id__in=medicine_ids).only("id", "name", "sku", "pharmacy")
+        # Every medicine's history in one grouped query; the models then run in memory
+        demand_by_medicine = InventoryOptimizationService.calculate_daily_demand_bulk(medicine_ids, pharmacy=pharmacy)
+        compare = partial(
+            InventoryOptimizationService.compare_forecasts, pharmacy=pharmacy, forecast_days=days, alpha=alpha
+        )
         results = []
         for medicine in medicines:
-            comparison = InventoryOptimizationService.compare_forecasts(
-                medicine=medicine,
-                pharmacy=medicine.pharmacy if pharmacy is None else pharmacy,
-                forecast_days=days,
-                alpha=alpha,
-            )
+            comparison = compare(medicine=medicine, demand_data=demand_by_medicine[medicine.id])
             selected = comparison["selected_forecast"]
             results.append(
                 {
@@ -440,6 +569,9 @@ class DemandForecastingService:
     Forecasting facade backed by InventoryOptimizationService.
     """
 
+    FORECAST_CHUNK_SIZE = 500
+
+    DEFAULT_METHOD = "moving_average"
     METHOD_ALIASES = {
         "sma": "moving_average",
         "moving_average": "moving_average",
@@ -451,7 +583,10 @@ class DemandForecastingService:
 
     @staticmethod
     def _normalize_method(method):
-        return DemandForecastingService.METHOD_ALIASES.get((method or "").lower(), "moving_average")
+        # ``method`` is a query-param string; falsy values skip the lookup.
+        if not method:
+            return DemandForecastingService.DEFAULT_METHOD
+        return DemandForecastingService.METHOD_ALIASES.get(method.lower(), DemandForecastingService.DEFAULT_METHOD)
 
     @staticmethod
     def _format_result(medicine, method, result):
@@ -487,49 +622,55 @@ class DemandForecastingService:
     @staticmethod
     def get_forecast(days=30, medicine_id=None, method="sma", pharmacy=None, alpha=0.3):
         normalized = DemandForecastingService._normalize_method(method)
-        medicines = (
-            SalesAnalyticsService._scope_medicines(pharmacy).filter(id=medicine_id)
-            if medicine_id
-            else SalesAnalyticsService._scope_medicines(pharmacy)
-        )
+        medicines = SalesAnalyticsService._scope_medicines(pharmacy).only("id", "name", "sku", "pharmacy")
+        if medicine_id:
+            medicines = medicines.filter(id=medicine_id)
+
+        # Resolve the model and its fixed arguments once, not per medicine
+        if normalized == "exponential_smoothing":
+            forecaster = partial(
+                InventoryOptimizationService.exponential_smoothing, pharmacy=pharmacy, forecast_days=days, alpha=alpha
+            )
+        else:
+            forecaster = partial(
+                InventoryOptimizationService.moving_average_forecast, pharmacy=pharmacy, forecast_days=days
+            )
 
-        forecasts = []
         forecasts_by_medicine = {}
-        for medicine in medicines:
-            scoped_pharmacy = medicine.pharmacy if pharmacy is None else pharmacy
-            if normalized == "exponential_smoothing":
-                raw = InventoryOptimizationService.exponential_smoothing(
-                    medicine=medicine,
-                    pharmacy=scoped_pharmacy,
-                    forecast_days=days,
-                    alpha=alpha,
-                )
-            else:
-                raw = InventoryOptimizationService.moving_average_forecast(
+        # Stream medicines in chunks so neither the ORM objects nor the
+        # medicine_id IN (...) list of the history query grow with the catalogue.
+        rows = medicines.iterator(chunk_size=DemandForecastingService.FORECAST_CHUNK_SIZE)
+        for chunk in iter(lambda: list(islice(rows, DemandForecastingService.FORECAST_CHUNK_SIZE)), []):
+            # One grouped query for the chunk's history instead of one per medicine
+            demand_by_medicine = InventoryOptimizationService.calculate_daily_demand_bulk(
+                [medicine.id for medicine in chunk],
+                pharmacy=pharmacy,
+            )
+            for medicine in chunk:
+                raw = forecaster(medicine=medicine, demand_data=demand_by_medicine[medicine.id])
+                formatted = DemandForecastingService._format_result(
                     medicine=medicine,
-                    pharmacy=scoped_pharmacy,
-                    forecast_days=days,
+                    method=normalized,
+                    result=raw,
                 )
-
-            formatted = DemandForecastingService._format_result(
-                medicine=medicine,
-                method=normalized,
-                result=raw,
-            )
-            forecasts.append(formatted)
-            forecasts_by_medicine[str(medicine.id)] = formatted
+                forecasts_by_medicine[str(medicine.id)] = formatted
 
         return {
             "forecast_period_days": days,
             "method": normalized,
-            "forecasts": forecasts,
+            # Dicts keep insertion order, so this matches the iteration order
+            "forecasts": list(forecasts_by_medicine.values()),
             "forecasts_by_medicine": forecasts_by_medicine,
         }
 
     @staticmethod
     def get_forecast_comparison(medicine_id, days=30, pharmacy=None, alpha=0.3):
+        medicines = SalesAnalyticsService._scope_medicines(pharmacy).only("id", "name", "sku", "pharmacy")
+        if pharmacy is None:
+            # The medicine's own pharmacy scopes the forecast below
+            medicines = medicines.select_related("pharmacy")
         try:
-            medicine = SalesAnalyticsService._scope_medicines(pharmacy).get(id=medicine_id)
+            medicine = medicines.get(id=medicine_id)
         except Medicine.DoesNotExist:
             return None
 
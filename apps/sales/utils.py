@@ -4,8 +4,10 @@ Utility functions for sales analytics and reporting.
 Helper functions for data aggregation, formatting, and report generation.
 """
 from django.db.models import Sum, Count, Avg
+from django.db.models.functions import ExtractWeekDay
 from django.utils import timezone
 from datetime import timedelta, datetime
+from apps.inventory.models import Inventory
 from .models import Sale, SaleItem
 
 
@@ -55,23 +57,24 @@ def get_date_range_periods(start_date, end_date, period='daily'):
     Returns:
         list: List of period boundaries
     """
+    if period in ('daily', 'weekly'):
+        # Fixed-width steps: the period count is known up front
+        step = timedelta(days=1) if period == 'daily' else timedelta(weeks=1)
+        count = (end_date - start_date) // step + 1
+        return [(start_date + step * i).date() for i in range(max(count, 0))]
+
     periods = []
+    if period != 'monthly':
+        return periods
+
     current = start_date
-    
     while current <= end_date:
-        if period == 'daily':
-            periods.append(current.date())
-            current += timedelta(days=1)
-        elif period == 'weekly':
-            periods.append(current.date())
-            current += timedelta(weeks=1)
-        elif period == 'monthly':
-            # Move to first day of next month
-            if current.month == 12:
-                current = current.replace(year=current.year + 1, month=1, day=1)
-            else:
-                current = current.replace(month=current.month + 1, day=1)
-            periods.append(current.date())
+        # Move to first day of next month
+        if current.month == 12:
+            current = current.replace(year=current.year + 1, month=1, day=1)
+        else:
+            current = current.replace(month=current.month + 1, day=1)
+        periods.append(current.date())
     
     return periods
 
@@ -162,11 +165,10 @@ def calculate_inventory_turnover(medicine_id, days=30):
     total_quantity_sold = sale_items.aggregate(Sum('quantity'))['quantity__sum'] or 0
     
     # Get average inventory (simplified - would need historical inventory snapshots)
-    from apps.inventory.models import Inventory
     try:
-        inventory = Inventory.objects.get(medicine_id=medicine_id)
+        inventory = Inventory.objects.only('current_stock').get(medicine_id=medicine_id)
         avg_inventory = inventory.current_stock  # Simplified
-    except:
+    except Inventory.DoesNotExist:
         avg_inventory = 0
     
     # Calculate turnover
@@ -214,17 +216,25 @@ def generate_sales_summary(start_date=None, end_date=None):
     # Get top medicines
     top_medicines = get_top_performers(limit=5, days=(end_date - start_date).days)
     
-    # Get sales by day of week
+    # Get sales by day of week (ExtractWeekDay is 1=Sunday; report 0=Sunday)
     daily_sales = (
         sales
-        .extra(select={'day_of_week': "strftime('%%w', date)"})
-        .values('day_of_week')
+        .annotate(weekday=ExtractWeekDay('date'))
+        .values('weekday')
         .annotate(
             count=Count('id'),
             revenue=Sum('total_amount')
         )
-        .order_by('day_of_week')
+        .order_by('weekday')
     )
+    daily_breakdown = [
+        {
+            'day_of_week': str(row['weekday'] - 1),
+            'count': row['count'],
+            'revenue': row['revenue'],
+        }
+        for row in daily_sales
+    ]
     
     return {
         'period': {
@@ -239,5 +249,5 @@ def generate_sales_summary(start_date=None, end_date=None):
             'formatted_revenue': format_currency(total_revenue),
         },
         'top_medicines': top_medicines,
-        'daily_breakdown': list(daily_sales),
+        'daily_breakdown': daily_breakdown,
     }
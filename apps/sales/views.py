@@ -6,6 +6,8 @@ Handles CRUD operations for sales, plus analytics, forecasting, and exports.
 import csv
 from datetime import datetime
 
+from django.core.cache import cache
+from django.db.models import Count, Prefetch
 from django.http import HttpResponse
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
@@ -18,13 +20,13 @@ from apps.inventory.services import InventoryService
 from apps.tenants.mixins import TenantScopedQuerysetMixin
 from apps.tenants.models import Pharmacy
 from apps.tenants.utils import require_user_pharmacy
-from .models import Sale
+from .models import Sale, SaleItem
 from .serializers import SaleCreateSerializer, SaleListSerializer, SaleSerializer
 from .services import DemandForecastingService, SalesAnalyticsService
 
 
 class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
-    queryset = Sale.objects.select_related("user", "pharmacy").prefetch_related("items__medicine").all()
+    queryset = Sale.objects.select_related("user", "pharmacy").all()
     permission_classes = [SaleRolePermission]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["notes", "user__username"]
@@ -38,12 +40,29 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
             return SaleListSerializer
         return SaleSerializer
 
+    def list(self, request, *args, **kwargs):
+        """List sales from a values() projection rather than model instances."""
+        queryset = self.filter_queryset(self.get_queryset()).values(*SaleListSerializer.values_fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(SaleListSerializer.from_values(page))
+        return Response(SaleListSerializer.from_values(queryset))
+
     def create(self, request, *args, **kwargs):
         response = super().create(request, *args, **kwargs)
         if response.status_code == status.HTTP_201_CREATED and isinstance(response.data, dict):
             response.data["message"] = _("Sale created successfully")
         return response
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        SalesAnalyticsService.invalidate_cache(serializer.instance.pharmacy_id)
+
+    def perform_destroy(self, instance):
+        pharmacy_id = instance.pharmacy_id
+        super().perform_destroy(instance)
+        SalesAnalyticsService.invalidate_cache(pharmacy_id)
+
     def _resolve_action_pharmacy(self):
         user = self.request.user
         if user.is_superuser:
@@ -53,6 +72,15 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
             return None
         return require_user_pharmacy(user)
 
+    def _cached_analytics(self, pharmacy, producer, *key_parts):
+        """Serve ``producer()`` from the pharmacy's versioned analytics cache."""
+        key = SalesAnalyticsService.cache_key(pharmacy, self.action, *key_parts)
+        data = cache.get(key)
+        if data is None:
+            data = producer()
+            cache.set(key, data, SalesAnalyticsService.CACHE_TIMEOUT)
+        return data
+
     def get_queryset(self):
         queryset = self.get_tenant_queryset(super().get_queryset())
 
@@ -67,7 +95,14 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
         if user_id:
             queryset = queryset.filter(user_id=user_id)
 
-        return queryset
+        # The list serializer has no nested items, so only other actions load them
+        if self.action != "list":
+            queryset = queryset.prefetch_related(
+                Prefetch("items", queryset=SaleItem.objects.select_related("medicine"))
+            )
+
+        # Serialized as items_count, so listing sales needs no per-row COUNT query
+        return queryset.annotate(items_count=Count("items"))
 
     @action(detail=False, methods=["get"])
     def analytics(self, request):
@@ -130,10 +165,15 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
 
-        analytics = SalesAnalyticsService.get_category_analytics(
-            start_date=start_date,
-            end_date=end_date,
-            pharmacy=pharmacy,
+        analytics = self._cached_analytics(
+            pharmacy,
+            lambda: SalesAnalyticsService.get_category_analytics(
+                start_date=start_date,
+                end_date=end_date,
+                pharmacy=pharmacy,
+            ),
+            start_date,
+            end_date,
         )
         return Response(analytics, status=status.HTTP_200_OK)
 
@@ -150,10 +190,15 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
         if end_date:
             end_date = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
 
-        trends = SalesAnalyticsService.get_monthly_trends(
-            start_date=start_date,
-            end_date=end_date,
-            pharmacy=pharmacy,
+        trends = self._cached_analytics(
+            pharmacy,
+            lambda: SalesAnalyticsService.get_monthly_trends(
+                start_date=start_date,
+                end_date=end_date,
+                pharmacy=pharmacy,
+            ),
+            start_date,
+            end_date,
         )
         return Response(trends, status=status.HTTP_200_OK)
 
@@ -185,7 +230,12 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
 
         days = int(request.query_params.get("days", 30))
         limit = int(request.query_params.get("limit", 10))
-        fast_moving = SalesAnalyticsService.get_fast_moving_medicines(days=days, limit=limit, pharmacy=pharmacy)
+        fast_moving = self._cached_analytics(
+            pharmacy,
+            lambda: SalesAnalyticsService.get_fast_moving_medicines(days=days, limit=limit, pharmacy=pharmacy),
+            days,
+            limit,
+        )
         return Response(fast_moving, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
@@ -195,7 +245,11 @@ class SaleViewSet(TenantScopedQuerysetMixin, viewsets.ModelViewSet):
             return Response({"error": _("Pharmacy not found")}, status=status.HTTP_404_NOT_FOUND)
 
         days = int(request.query_params.get("days", 90))
-        slow_moving = SalesAnalyticsService.get_slow_moving_medicines(days=days, pharmacy=pharmacy)
+        slow_moving = self._cached_analytics(
+            pharmacy,
+            lambda: SalesAnalyticsService.get_slow_moving_medicines(days=days, pharmacy=pharmacy),
+            days,
+        )
         return Response(slow_moving, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
@@ -3,10 +3,12 @@ Template views for sales app.
 """
 import json
 from datetime import timedelta
+from functools import partial
 
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
 from django.shortcuts import render
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
@@ -65,10 +67,6 @@ def sales_analytics_view(request):
         date_filter = Q(date__gte=start_date)
 
     sales_queryset = _scope_queryset(Sale.objects.filter(date_filter), pharmacy)
-    total_sales = sales_queryset.count()
-    revenue_result = sales_queryset.aggregate(total=Sum("total_amount"))
-    total_revenue = float(revenue_result["total"] or 0)
-    average_sale = total_revenue / total_sales if total_sales > 0 else 0.0
 
     trend_start_date = start_date if start_date else timezone.now() - timedelta(days=30)
     trend_end_date = end_date if end_date else timezone.now()
@@ -76,17 +74,64 @@ def sales_analytics_view(request):
     daily_trends = (
         _scope_queryset(Sale.objects, pharmacy)
         .filter(trend_filter)
-        .extra(select={"day": "date(date)"})
+        .annotate(day=TruncDate("date"))
         .values("day")
         .annotate(total_sales=Count("id"), total_amount=Sum("total_amount"))
         .order_by("day")
     )
 
+    category_start_date = start_date if start_date else timezone.now() - timedelta(days=30)
+    category_dist = (
+        _scope_queryset(SaleItem.objects, pharmacy)
+        .filter(sale__date__gte=category_start_date)
+        .values("medicine__category__id", "medicine__category__name")
+        .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
+        .order_by("-total_revenue")
+    )
+
+    fast_start_date = timezone.now() - timedelta(days=30)
+    fast_moving = (
+        _scope_queryset(SaleItem.objects, pharmacy)
+        .filter(sale__date__gte=fast_start_date)
+        .values("medicine__id", "medicine__name", "medicine__sku")
+        .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
+        .order_by("-total_quantity")[:10]
+    )
+
+    # The sections share no data, so they are evaluated together and
+    # overlap on databases that allow concurrent connections.
+    tasks = {
+        "totals": partial(sales_queryset.aggregate, total_sales=Count("id"), total=Sum("total_amount")),
+        "daily_trends": partial(list, daily_trends),
+        "category_dist": partial(list, category_dist),
+        "fast_moving": partial(list, fast_moving),
+        "slow_moving": partial(SalesAnalyticsService.get_slow_moving_medicines, days=90, pharmacy=pharmacy),
+        "profit_metrics": partial(SalesAnalyticsService.get_profit_metrics, start_date, end_date, pharmacy=pharmacy),
+        "cashier_performance": partial(
+            SalesAnalyticsService.get_cashier_performance, start_date, end_date, pharmacy=pharmacy
+        ),
+        "stock_value": partial(SalesAnalyticsService.get_stock_value, pharmacy=pharmacy),
+    }
+    if start_date:
+        period_days = (end_date - start_date).days if end_date else 30
+        previous_period_end = start_date
+        previous_period_start = previous_period_end - timedelta(days=period_days)
+        previous_sales = _scope_queryset(
+            Sale.objects.filter(date__gte=previous_period_start, date__lt=previous_period_end),
+            pharmacy,
+        )
+        tasks["previous_revenue"] = partial(previous_sales.aggregate, total=Sum("total_amount"))
+    results = SalesAnalyticsService.run_concurrently(tasks)
+
+    total_sales = results["totals"]["total_sales"]
+    total_revenue = float(results["totals"]["total"] or 0)
+    average_sale = total_revenue / total_sales if total_sales > 0 else 0.0
+
     sales_trend_list = []
     trend_labels = []
     trend_sales_data = []
     trend_revenue_data = []
-    for item in daily_trends:
+    for item in results["daily_trends"]:
         day_str = str(item["day"])
         day_sales = item.get("total_sales", 0)
         day_revenue = float(item.get("total_amount", 0))
@@ -95,19 +140,10 @@ def sales_analytics_view(request):
         trend_sales_data.append(day_sales)
         trend_revenue_data.append(day_revenue)
 
-    category_start_date = start_date if start_date else timezone.now() - timedelta(days=30)
-    category_dist = (
-        _scope_queryset(SaleItem.objects, pharmacy)
-        .filter(sale__date__gte=category_start_date)
-        .values("medicine__category__id", "medicine__category__name")
-        .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
-        .order_by("-total_revenue")
-    )
-
     category_list = []
     category_labels = []
     category_revenue_data = []
-    for item in category_dist:
+    for item in results["category_dist"]:
         cat_name = item.get("medicine__category__name") or str(_("Uncategorized"))
         cat_revenue = float(item.get("total_revenue", 0))
         cat_quantity = item.get("total_quantity", 0)
@@ -121,77 +157,19 @@ def sales_analytics_view(request):
         category_labels.append(cat_name)
         category_revenue_data.append(cat_revenue)
 
-    fast_start_date = timezone.now() - timedelta(days=30)
-    fast_moving = (
-        _scope_queryset(SaleItem.objects, pharmacy)
-        .filter(sale__date__gte=fast_start_date)
-        .values("medicine__id", "medicine__name", "medicine__sku")
-        .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
-        .order_by("-total_quantity")[:10]
-    )
-
-    slow_start_date = timezone.now() - timedelta(days=90)
-    from apps.medicines.models import Medicine
-
-    all_medicines = _scope_queryset(Medicine.objects, pharmacy).all()
-    medicines_with_sales = (
-        _scope_queryset(SaleItem.objects, pharmacy)
-        .filter(sale__date__gte=slow_start_date)
-        .values_list("medicine_id", flat=True)
-        .distinct()
-    )
-
-    slow_moving_list = []
-    for medicine in all_medicines:
-        if medicine.id not in medicines_with_sales:
-            slow_moving_list.append(
-                {
-                    "medicine_id": medicine.id,
-                    "medicine_name": medicine.name,
-                    "medicine_sku": medicine.sku,
-                    "total_quantity": 0,
-                    "total_revenue": 0,
-                    "sale_count": 0,
-                }
-            )
-            continue
-
-        sales_data = (
-            _scope_queryset(SaleItem.objects, pharmacy)
-            .filter(medicine=medicine, sale__date__gte=slow_start_date)
-            .aggregate(total_quantity=Sum("quantity"), total_revenue=Sum("subtotal"), sale_count=Count("sale", distinct=True))
-        )
-        if (sales_data["total_quantity"] or 0) < 5:
-            slow_moving_list.append(
-                {
-                    "medicine_id": medicine.id,
-                    "medicine_name": medicine.name,
-                    "medicine_sku": medicine.sku,
-                    "total_quantity": sales_data["total_quantity"] or 0,
-                    "total_revenue": float(sales_data["total_revenue"] or 0),
-                    "sale_count": sales_data["sale_count"] or 0,
-                }
-            )
+    fast_moving = results["fast_moving"]
+    slow_moving_list = results["slow_moving"]
 
     growth_percentage = None
     if start_date:
-        period_days = (end_date - start_date).days if end_date else 30
-        previous_period_end = start_date
-        previous_period_start = previous_period_end - timedelta(days=period_days)
         current_revenue = total_revenue
-
-        previous_sales = _scope_queryset(
-            Sale.objects.filter(date__gte=previous_period_start, date__lt=previous_period_end),
-            pharmacy,
-        )
-        previous_revenue_result = previous_sales.aggregate(total=Sum("total_amount"))
-        previous_revenue = float(previous_revenue_result["total"] or 0)
+        previous_revenue = float(results["previous_revenue"]["total"] or 0)
         if previous_revenue > 0:
             growth_percentage = ((current_revenue - previous_revenue) / previous_revenue) * 100
 
-    profit_metrics = SalesAnalyticsService.get_profit_metrics(start_date, end_date, pharmacy=pharmacy)
-    cashier_performance = SalesAnalyticsService.get_cashier_performance(start_date, end_date, pharmacy=pharmacy)
-    stock_value = SalesAnalyticsService.get_stock_value(pharmacy=pharmacy)
+    profit_metrics = results["profit_metrics"]
+    cashier_performance = results["cashier_performance"]
+    stock_value = results["stock_value"]
 
     context = {
         "total_sales": total_sales,
@@ -205,7 +183,7 @@ def sales_analytics_view(request):
         "category_labels_json": json.dumps(category_labels),
         "category_revenue_json": json.dumps(category_revenue_data),
         "category_distribution": category_list,
-        "fast_moving_medicines": [{**item, "total_revenue": float(item.get("total_revenue", 0))} for item in list(fast_moving)],
+        "fast_moving_medicines": [{**item, "total_revenue": float(item.get("total_revenue", 0))} for item in fast_moving],
         "slow_moving_medicines": [{**item, "total_revenue": float(item.get("total_revenue", 0))} for item in slow_moving_list[:10]],
         "gross_profit": profit_metrics["gross_profit"],
         "gross_margin_percent": profit_metrics["gross_margin_percent"],
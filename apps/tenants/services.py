@@ -107,6 +107,19 @@ class SubscriptionService:
             "message": message,
         }
 
+    @staticmethod
+    def remaining_quota(pharmacy, resource_type):
+        """
+        Return how many more units of ``resource_type`` the pharmacy may use.
+
+        Returns None for unlimited plans. Callers creating several records can
+        fetch this once and count down locally instead of re-checking per record.
+        """
+        remaining = SubscriptionService.check_limit(pharmacy, resource_type)["remaining"]
+        if remaining is None:
+            return None
+        return max(remaining, 0)
+
     @staticmethod
     def enforce_limits(pharmacy, resource_type):
         limit_status = SubscriptionService.check_limit(pharmacy, resource_type)
@@ -1,8 +1,32 @@
+import json
 import sys
 from copy import copy as shallow_copy
 
 import django
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def json_loads(data):
+    """
+    Parse JSON from bytes or str, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(data, default=None):
+    """
+    Serialize to compact UTF-8 JSON bytes, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, default=default)
+    return json.dumps(data, default=default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
 
 def patch_django42_basecontext_copy_for_py314():
     """
@@ -126,6 +126,28 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/ref/settings/#caches
+# Sales analytics (the summary, the per-section endpoints and the forecast
+# accuracy table) are cached here. LocMemCache is per process: a sale
+# recorded in one worker only retires that worker's entries, and the others
+# serve theirs until they expire. settings_production switches to a shared
+# Redis cache when REDIS_URL is set.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+
+# SaleItem's covering index uses INCLUDE, which only PostgreSQL (production)
+# supports; on the SQLite dev/test database it degrades to a plain
+# (sale, medicine) index by design. settings_production clears this so the
+# check stays live against the production backend.
+SILENCED_SYSTEM_CHECKS = ["models.W040"]
+
+
 # Custom User Model
 AUTH_USER_MODEL = "accounts.User"
 
@@ -26,12 +26,39 @@ DATABASES = {
         "HOST": config("POSTGRES_HOST", default="127.0.0.1"),
         "PORT": config("POSTGRES_PORT", default="5432"),
         "CONN_MAX_AGE": config("POSTGRES_CONN_MAX_AGE", default=60, cast=int),
+        # Persistent connections are health-checked before reuse instead of failing a request
+        "CONN_HEALTH_CHECKS": config("POSTGRES_CONN_HEALTH_CHECKS", default=True, cast=bool),
+        # Required behind PgBouncer in transaction pooling mode (set CONN_MAX_AGE=0 there)
+        "DISABLE_SERVER_SIDE_CURSORS": config("POSTGRES_DISABLE_SERVER_SIDE_CURSORS", default=False, cast=bool),
         "OPTIONS": {
             "sslmode": config("POSTGRES_SSLMODE", default="prefer"),
         },
     }
 }
 
+# PostgreSQL supports SaleItem's INCLUDE index, so models.W040 (silenced for
+# the SQLite dev/test database) must not be masked here.
+SILENCED_SYSTEM_CHECKS = []
+
+# Sales analytics are cached and retired by bumping a per-pharmacy version key
+# on every sale write. Every worker process must share one cache for that bump
+# to reach them all; without REDIS_URL each process keeps its own LocMemCache
+# and may serve stale analytics for up to the cache timeout.
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+
+# Uncached sales analytics run their independent queries on this many worker
+# threads. Each thread opens (and closes) its own PostgreSQL connection, so one
+# uncached request can use this many connections on top of the request's own;
+# size it against max_connections / the PgBouncer pool. 1 runs them in order.
+SALES_ANALYTICS_WORKERS = config("SALES_ANALYTICS_WORKERS", default=6, cast=int)
+
 if "whitenoise.middleware.WhiteNoiseMiddleware" not in MIDDLEWARE:
     MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
 
@@ -1,10 +1,20 @@
+import json
+from datetime import timedelta
 from decimal import Decimal
+from unittest import mock
 
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import DataError
+from django.db.models import QuerySet
 from django.test import TestCase
+from django.utils import timezone
 
 from apps.accounts.models import User
 from apps.inventory.models import ActivityLog, Inventory, PurchaseOrder, StockMovement, Supplier
 from apps.medicines.models import Medicine
+from apps.medicines.views import MedicineViewSet
+from apps.pos_integration import views as pos_views
+from apps.sales.models import Sale, SaleItem
 from apps.tenants.models import Pharmacy
 
 
@@ -117,3 +127,94 @@ class OperationsWorkflowTests(TestCase):
                 quantity_change=5,
             ).exists()
         )
+
+    def test_streamed_expiry_listing_matches_buffered_response(self):
+        expired_on = timezone.localdate() - timedelta(days=3)
+        for index, name in enumerate(["Парацетамол", "Ibuprofen", "Aspirin"]):
+            Medicine.objects.create(
+                pharmacy=self.pharmacy,
+                name=name,
+                sku=f"EXP-{index}",
+                unit_price=Decimal("5000.00"),
+                expiry_date=expired_on + timedelta(days=index),
+            )
+        self.client.force_login(self.owner)
+
+        buffered = self.client.get("/api/medicines/medicines/expired/")
+        self.assertFalse(buffered.streaming)
+
+        # Three rows in chunks of two: the stream crosses a chunk boundary
+        with mock.patch.object(MedicineViewSet, "EXPIRY_STREAMING_THRESHOLD", 1), mock.patch.object(
+            MedicineViewSet, "EXPIRY_STREAM_CHUNK_SIZE", 2
+        ):
+            streamed = self.client.get("/api/medicines/medicines/expired/")
+            self.assertTrue(streamed.streaming)
+            body = b"".join(streamed.streaming_content)
+            browsable = self.client.get("/api/medicines/medicines/expired/?format=api")
+
+        self.assertEqual(json.loads(body), buffered.json())
+        self.assertEqual(json.loads(body)["count"], 3)
+        self.assertIn("Парацетамол".encode(), body)
+        self.assertFalse(browsable.streaming)
+        self.assertEqual(browsable.status_code, 200)
+
+        with mock.patch.object(MedicineViewSet, "EXPIRY_STREAMING_THRESHOLD", 0):
+            empty = self.client.get("/api/medicines/medicines/expiring_soon/")
+            self.assertTrue(empty.streaming)
+            empty_body = b"".join(empty.streaming_content)
+        self.assertEqual(json.loads(empty_body), {"count": 0, "days": 30, "medicines": []})
+
+    def _import_csv(self, quantities, query=""):
+        rows = "".join(f",BAR-001,{quantity},1000.00,row {index}\n" for index, quantity in enumerate(quantities))
+        upload = SimpleUploadedFile("sales.csv", ("date,medicine_sku,quantity,unit_price,notes\n" + rows).encode())
+        self.client.force_login(self.owner)
+        return self.client.post(f"/api/pos/import-csv/{query}", {"file": upload})
+
+    def test_csv_import_spans_several_chunks(self):
+        with mock.patch.object(pos_views, "CSV_IMPORT_CHUNK_SIZE", 2):
+            response = self._import_csv([1, 1, 2, 1, 3])
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["created"], 5)
+        self.assertEqual(response.json()["errors"], [])
+        self.assertEqual(Sale.objects.count(), 5)
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_stock, 12)
+
+    def test_csv_row_rejected_by_database_fails_alone(self):
+        original_bulk_create = QuerySet.bulk_create
+
+        def bulk_create(queryset, objs, *args, **kwargs):
+            # Quantity 7 stands in for a row the database refuses (e.g. numeric overflow)
+            if queryset.model is SaleItem and any(item.quantity == 7 for item in objs):
+                raise DataError("numeric field overflow")
+            return original_bulk_create(queryset, objs, *args, **kwargs)
+
+        with mock.patch.object(pos_views, "CSV_IMPORT_CHUNK_SIZE", 2), mock.patch.object(
+            QuerySet, "bulk_create", bulk_create
+        ), mock.patch.object(pos_views.SubscriptionService, "remaining_quota", return_value=3):
+            response = self._import_csv([1, 7, 2, 3])
+
+        payload = response.json()
+        self.assertEqual(response.status_code, 201)
+        # The failed row hands its quota slot back, so the fourth row still fits
+        self.assertEqual(payload["created"], 3)
+        self.assertEqual(len(payload["errors"]), 1)
+        self.assertIn("numeric field overflow", payload["errors"][0])
+        self.assertEqual(Sale.objects.count(), 3)
+        self.assertEqual(sorted(SaleItem.objects.values_list("quantity", flat=True)), [1, 2, 3])
+        self.inventory.refresh_from_db()
+        self.assertEqual(self.inventory.current_stock, 14)
+
+    def test_csv_import_streams_ndjson_lines(self):
+        with mock.patch.object(pos_views, "CSV_IMPORT_CHUNK_SIZE", 2):
+            response = self._import_csv([1, 0, 2], query="?stream=ndjson")
+            self.assertTrue(response.streaming)
+            lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual(len(lines), 4)
+        self.assertIn("3", lines[0]["error"])
+        sale_ids = [line["sale"]["id"] for line in lines if "sale" in line]
+        self.assertCountEqual(sale_ids, Sale.objects.values_list("id", flat=True))
+        self.assertEqual(lines[-1], {"created": 2, "errors": 1})
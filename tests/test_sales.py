@@ -1,15 +1,24 @@
 import json
+import threading
+from functools import partial
+from unittest import mock
 from decimal import Decimal
 
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
 from django.utils import translation
 from django.utils.translation import gettext as _
 
 from apps.accounts.models import User
-from apps.inventory.models import Inventory
+from apps.inventory.models import ActivityLog, Inventory, StockMovement
+from apps.inventory.services import InventoryService
 from apps.medicines.models import Medicine
 from apps.sales.models import Sale, SaleItem
+from apps.sales.serializers import SaleListSerializer
+from apps.sales.services import SalesAnalyticsService
 from apps.tenants.models import Pharmacy
 
 
@@ -76,6 +85,145 @@ class SalesFlowTests(TestCase):
         self.inventory.refresh_from_db()
         self.assertEqual(self.inventory.current_stock, 22)
 
+    def test_sale_creates_missing_inventory_like_adjust_stock(self):
+        unstocked = Medicine.objects.create(
+            name="Analgin", sku="ANL-001", unit_price=Decimal("4000.00"), pharmacy=self.pharmacy
+        )
+        reference = Medicine.objects.create(
+            name="Aspirin", sku="ASP-001", unit_price=Decimal("3000.00"), pharmacy=self.pharmacy
+        )
+        self.client.force_login(self.pharmacist)
+
+        response = self.client.post(
+            "/api/sales/sales/",
+            data=json.dumps({"items": [{"medicine_id": unstocked.id, "quantity": 2, "unit_price": "4000.00"}]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        sale = Sale.objects.get()
+
+        # The per-item path the bulk one replaced
+        reference_inventory, _created = Inventory.objects.get_or_create(
+            medicine=reference,
+            pharmacy=self.pharmacy,
+            defaults={"current_stock": 0, "min_stock_level": 20, "max_stock_level": 120},
+        )
+        InventoryService.adjust_stock(
+            inventory=reference_inventory,
+            quantity_change=-2,
+            movement_type=StockMovement.TYPE_SALE,
+            user=self.pharmacist,
+            source_type="Sale",
+            source_id=sale.id,
+        )
+
+        inventory = Inventory.objects.get(medicine=unstocked)
+        self.assertEqual(inventory.pharmacy, self.pharmacy)
+        self.assertEqual(
+            (inventory.current_stock, inventory.min_stock_level, inventory.max_stock_level), (0, 20, 120)
+        )
+        movement = StockMovement.objects.get(inventory=inventory)
+        reference_movement = StockMovement.objects.get(inventory=reference_inventory)
+        self.assertEqual(
+            (movement.movement_type, movement.quantity_change, movement.stock_after),
+            (reference_movement.movement_type, reference_movement.quantity_change, reference_movement.stock_after),
+        )
+        log = ActivityLog.objects.get(entity_type="Inventory", entity_id=inventory.id)
+        reference_log = ActivityLog.objects.get(entity_type="Inventory", entity_id=reference_inventory.id)
+        self.assertEqual(log.metadata, {**reference_log.metadata, "medicine_id": unstocked.id})
+        self.assertEqual(log.description, "Analgin: stock changed by -2")
+
+    def test_analytics_are_cached_until_a_sale_is_recorded(self):
+        cache.clear()
+        self.client.force_login(self.pharmacist)
+
+        analytics = SalesAnalyticsService.get_analytics(pharmacy=self.pharmacy)
+        self.assertEqual(analytics["summary"]["total_sales"], 0)
+        with self.assertNumQueries(0):
+            SalesAnalyticsService.get_analytics(pharmacy=self.pharmacy)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/sales/sales/",
+                data=json.dumps({"items": [{"medicine_id": self.medicine.id, "quantity": 1, "unit_price": "9000.00"}]}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+        analytics = SalesAnalyticsService.get_analytics(pharmacy=self.pharmacy)
+        self.assertEqual(analytics["summary"]["total_sales"], 1)
+
+    def test_monthly_trends_total_each_month(self):
+        sale = Sale.objects.create(total_amount=Decimal("18000.00"), user=self.pharmacist, pharmacy=self.pharmacy)
+        SaleItem.objects.create(
+            sale=sale,
+            medicine=self.medicine,
+            pharmacy=self.pharmacy,
+            quantity=2,
+            unit_price=Decimal("9000.00"),
+        )
+
+        Sale.objects.create(total_amount=Decimal("6000.00"), user=self.pharmacist, pharmacy=self.pharmacy)
+
+        trends = SalesAnalyticsService.get_monthly_trends(pharmacy=self.pharmacy)
+
+        self.assertEqual(len(trends), 1)
+        self.assertEqual(trends[0]["month"], sale.date.strftime("%Y-%m"))
+        self.assertEqual(trends[0]["total_sales"], 2)
+        self.assertEqual(trends[0]["total_amount"], Decimal("24000.00"))
+        self.assertEqual(Decimal(trends[0]["avg_sale_amount"]), Decimal("12000.00"))
+
+    def test_non_positive_unit_prices_are_rejected(self):
+        self.client.force_login(self.pharmacist)
+
+        for price in ("0", "-5"):
+            api_response = self.client.post(
+                "/api/sales/sales/",
+                data=json.dumps({"items": [{"medicine_id": self.medicine.id, "quantity": 1, "unit_price": price}]}),
+                content_type="application/json",
+            )
+            self.assertEqual(api_response.status_code, 400)
+
+            pos_response = self.client.post(
+                "/api/pos/sales/",
+                data=json.dumps({"items": [{"medicine_sku": self.medicine.sku, "quantity": 1, "unit_price": price}]}),
+                content_type="application/json",
+            )
+            self.assertEqual(pos_response.status_code, 400)
+
+        self.assertFalse(SaleItem.objects.exists())
+
+    def test_list_rows_from_values_match_the_serializer(self):
+        first_name_only = User.objects.create_user(
+            username="sales_cashier",
+            password="pass12345",
+            role=User.ROLE_CASHIER,
+            pharmacy=self.pharmacy,
+            first_name="Dilnoza",
+        )
+        self.pharmacist.last_name = "Karimova"
+        self.pharmacist.save(update_fields=["last_name"])
+        for user in (self.pharmacist, first_name_only, None):
+            sale = Sale.objects.create(total_amount=Decimal("9000.00"), user=user, pharmacy=self.pharmacy)
+            SaleItem.objects.create(
+                sale=sale,
+                medicine=self.medicine,
+                pharmacy=self.pharmacy,
+                quantity=1,
+                unit_price=Decimal("9000.00"),
+            )
+
+        queryset = (
+            Sale.objects.select_related("user", "pharmacy")
+            .annotate(items_count=Count("items"))
+            .order_by("pk")
+        )
+        from_values = SaleListSerializer.from_values(queryset.values(*SaleListSerializer.values_fields))
+        serialized = SaleListSerializer(queryset, many=True).data
+        self.assertEqual(from_values, serialized)
+        # Key order is part of the rendered JSON too
+        self.assertEqual([list(row) for row in from_values], [list(row) for row in serialized])
+
     def test_pharmacist_cannot_modify_medicines(self):
         self.client.force_login(self.pharmacist)
         response = self.client.patch(
@@ -84,3 +232,38 @@ class SalesFlowTests(TestCase):
             content_type="application/json",
         )
         self.assertEqual(response.status_code, 403)
+
+
+class RunConcurrentlyTests(TransactionTestCase):
+    def setUp(self):
+        owner = User.objects.create_user(username="threads_owner", password="pass12345", role=User.ROLE_ADMIN)
+        self.pharmacy = Pharmacy.objects.create(name="Threads Pharmacy", owner=owner)
+        for amount in ("1000.00", "2500.00"):
+            Sale.objects.create(total_amount=Decimal(amount), user=owner, pharmacy=self.pharmacy)
+
+    def _tasks(self):
+        return {
+            "count": Sale.objects.count,
+            "total": partial(Sale.objects.aggregate, total=Sum("total_amount")),
+            "thread": threading.get_ident,
+        }
+
+    def test_threaded_results_match_sequential_run(self):
+        sequential = SalesAnalyticsService.run_concurrently(self._tasks())
+        # Any vendor but SQLite takes the thread-pool branch
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            threaded = SalesAnalyticsService.run_concurrently(self._tasks())
+
+        self.assertEqual(sequential["thread"], threading.get_ident())
+        self.assertNotEqual(threaded["thread"], threading.get_ident())
+        self.assertEqual(threaded["count"], 2)
+        self.assertEqual(threaded["total"], sequential["total"])
+        self.assertEqual(threaded["count"], sequential["count"])
+
+    def test_threaded_task_errors_propagate(self):
+        def fail():
+            raise ValueError("boom")
+
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            with self.assertRaisesMessage(ValueError, "boom"):
+                SalesAnalyticsService.run_concurrently({"count": Sale.objects.count, "fail": fail})
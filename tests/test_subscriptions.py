@@ -108,6 +108,27 @@ class SubscriptionServiceTests(TestCase):
         with self.assertRaises(ValidationError):
             SubscriptionService.enforce_limits(self.pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES)
 
+    def test_remaining_quota_counts_down_and_is_unlimited_on_enterprise(self):
+        Sale.objects.bulk_create(
+            [
+                Sale(date=timezone.now(), total_amount=Decimal("1.00"), user=self.owner, pharmacy=self.pharmacy)
+                for _ in range(3)
+            ]
+        )
+        self.assertEqual(
+            SubscriptionService.remaining_quota(self.pharmacy, SubscriptionService.RESOURCE_MONTHLY_SALES),
+            997,
+        )
+
+        enterprise = Pharmacy.objects.create(
+            name="Unlimited Pharmacy",
+            owner=self.owner,
+            plan_type=Pharmacy.PlanType.ENTERPRISE,
+        )
+        self.assertIsNone(
+            SubscriptionService.remaining_quota(enterprise, SubscriptionService.RESOURCE_MONTHLY_SALES)
+        )
+
     def test_superuser_bypass_for_medicine_limit(self):
         self.pharmacy.max_medicines = 0
         self.pharmacy.save(update_fields=["max_medicines"])